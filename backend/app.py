@@ -4,10 +4,11 @@ import os
 import sys
 import socket
 import argparse
-import sqlite3
 from models import init_db
 from routes import register_routes
 from services.sync_service import sync_settings_from_json, update_sync_status
+from services.job_service import start_job_workers
+from utils.db_maintenance import backup_database, optimize_database, start_snapshot_scheduler
 
 # 開発モードチェック
 dev_mode = not getattr(sys, 'frozen', False)
@@ -55,65 +56,32 @@ def sync_settings_on_startup():
     except Exception as e:
         print(f"設定同期エラー: {str(e)}")
 
-def run_migrations(db_path):
-    """データベースマイグレーションを実行"""
-    try:
-        print("データベースマイグレーションを実行中...")
-        
-        # データベースが存在するか確認
-        if not os.path.exists(db_path):
-            print(f"データベースがまだ存在しません: {db_path}")
-            return
-            
-        # SQLite接続
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # image_metadataテーブルに存在するかを確認
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='image_metadata'")
-        if not cursor.fetchone():
-            print("image_metadataテーブルが存在しないため、マイグレーションをスキップします")
-            return
-            
-        # username列の有無を確認
-        cursor.execute("PRAGMA table_info(image_metadata)")
-        columns = cursor.fetchall()
-        column_names = [column[1] for column in columns]
-        
-        if 'username' not in column_names:
-            print("username列を追加中...")
-            cursor.execute("ALTER TABLE image_metadata ADD COLUMN username TEXT")
-            conn.commit()
-            print("マイグレーション成功: username列を追加しました")
-        
-        conn.close()
-    except Exception as e:
-        print(f"マイグレーションエラー: {str(e)}")
-
 def migrate_database(source_db_path, target_db_path):
     """古いデータベースから新しいデータベースに内容を移行する"""
     if not os.path.exists(source_db_path):
         print(f"移行元データベースが見つかりません: {source_db_path}")
         return False
     
-    # 単純にコピーするか、SQLiteのバックアップAPIを使用
-    import shutil
-    
-    # ターゲットディレクトリが存在することを確認
-    target_dir = os.path.dirname(target_db_path)
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-    
     # 既存のデータベースがある場合はバックアップ
     if os.path.exists(target_db_path):
         backup_path = f"{target_db_path}.bak"
-        shutil.copy2(target_db_path, backup_path)
+        backup_database(target_db_path, backup_path)
         print(f"既存のデータベースをバックアップしました: {backup_path}")
     
-    # データベースファイルをコピー
-    shutil.copy2(source_db_path, target_db_path)
+    # SQLiteのバックアップAPIでコピー（書き込み中のDBでも整合性が保たれる）
+    backup_database(source_db_path, target_db_path)
     return True
 
+def run_maintenance(db_path, vacuum_into=None):
+    """ANALYZE / PRAGMA optimize / VACUUM INTO を実行する"""
+    try:
+        result = optimize_database(db_path, vacuum_into=vacuum_into)
+        print(f"メンテナンス完了: {result}")
+        return True
+    except Exception as e:
+        print(f"メンテナンスエラー: {str(e)}")
+        return False
+
 def main():
     """メイン関数: サーバーの初期化と起動"""
     parser = argparse.ArgumentParser(description='VSA Backend API Server')
@@ -123,6 +91,12 @@ def main():
     parser.add_argument('--db-path', type=str, default=None, help='Path to SQLite database')
     parser.add_argument('--no-sync', action='store_true', help='Skip settings synchronization')
     parser.add_argument('--migrate-old-db', action='store_true', help='Migrate data from old database')
+    parser.add_argument('--maintenance', action='store_true', help='Run ANALYZE and PRAGMA optimize, then exit')
+    parser.add_argument('--vacuum-into', type=str, default=None, help='With --maintenance, write a compacted copy to this path')
+    parser.add_argument('--snapshot-interval', type=float, default=0, help='Hours between automatic database snapshots (0 to disable)')
+    parser.add_argument('--snapshot-retention', type=int, default=7, help='Number of snapshots to keep')
+    parser.add_argument('--snapshot-dir', type=str, default=None, help='Directory for database snapshots')
+    parser.add_argument('--job-workers', type=int, default=2, help='Number of background job worker threads')
     args = parser.parse_args()
     
     # データベースパスの設定 - ルートディレクトリに変更
@@ -147,12 +121,16 @@ def main():
     else:
         db_path = args.db_path
     
-    # マイグレーションを実行
-    run_migrations(db_path)
+    # メンテナンスのみ実行して終了
+    if args.maintenance:
+        sys.exit(0 if run_maintenance(db_path, args.vacuum_into) else 1)
     
-    # データベース初期化
+    # データベース初期化（未適用のマイグレーションもここで実行）
     db_session = init_db(db_path)
     app.config['DB_SESSION'] = db_session
+    app.config['DB_PATH'] = db_path
+    app.config['SNAPSHOT_DIR'] = args.snapshot_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'snapshots')
+    app.config['SNAPSHOT_RETENTION'] = args.snapshot_retention
     
     # ルート登録
     register_routes(app)
@@ -161,6 +139,19 @@ def main():
     if not args.no_sync:
         sync_settings_on_startup()
     
+    # デバッグ時のリローダーでは、バックグラウンド処理は子プロセスでのみ開始する
+    reloader_parent = (args.dev or dev_mode) and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+    
+    # バックグラウンドジョブのワーカーを起動
+    if not reloader_parent:
+        start_job_workers(app, args.job_workers)
+    
+    # 定期スナップショット（--snapshot-intervalが指定されていれば開始）
+    if args.snapshot_interval > 0 and not reloader_parent:
+        start_snapshot_scheduler(db_path, app.config['SNAPSHOT_DIR'],
+                                 args.snapshot_interval, args.snapshot_retention)
+        print(f"定期スナップショットを有効化: {args.snapshot_interval}時間ごと -> {app.config['SNAPSHOT_DIR']}")
+    
     # 利用可能なポートを見つける
     host = args.host
     port = find_free_port(host, args.port)
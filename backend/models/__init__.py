@@ -13,8 +13,12 @@ def init_db(db_path):
     global engine, Session
     # SQLiteデータベース接続を作成
     engine = create_engine(f'sqlite:///{db_path}')
-    # テーブルが存在しない場合は作成
-    Base.metadata.create_all(engine)
+    # WALモードにして、長い書き込みの間も読み取りを止めない（設定はDBファイルに保存される）
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    # テーブル作成と未適用のマイグレーションを実行（最新ならPRAGMA読み込み1回のみ）
+    from models.migrations import run_migrations
+    run_migrations(engine)
     # セッションファクトリを作成
     Session = sessionmaker(bind=engine)
     return Session()
\ No newline at end of file
@@ -0,0 +1,146 @@
+from sqlalchemy import Column, Integer, String, Index
+from models import Base
+
+class Friend(Base):
+    """フレンド名の辞書（名前 -> 整数ID）"""
+    __tablename__ = 'friends'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(256), unique=True, nullable=False)  # フレンド名
+
+class ImageFriend(Base):
+    """フレンドごとの画像IDポスティングリスト
+
+    (friend_id, image_id) を主キーとするWITHOUT ROWIDテーブルなので、
+    フレンドごとに画像IDがソート済みの整数配列として格納される
+    """
+    __tablename__ = 'image_friends'
+    __table_args__ = (
+        Index('ix_image_friends_image_id', 'image_id', 'friend_id'),
+        {'sqlite_with_rowid': False},
+    )
+
+    friend_id = Column(Integer, primary_key=True)
+    image_id = Column(Integer, primary_key=True)
+
+class FriendPair(Base):
+    """同じ画像に写っているフレンドの組み合わせと回数（friend_a < friend_b）"""
+    __tablename__ = 'friend_pairs'
+    __table_args__ = (
+        Index('ix_friend_pairs_friend_b', 'friend_b', 'friend_a'),
+        {'sqlite_with_rowid': False},
+    )
+
+    friend_a = Column(Integer, primary_key=True)
+    friend_b = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)  # 一緒に写っている画像数
+
+# friends列が配列のJSONでない場合は空配列として扱う（トリガーで書き込みを失敗させない）
+def _friends_source(column):
+    return (f"COALESCE(CASE WHEN json_valid({column}) THEN "
+            f"CASE WHEN json_type({column}) = 'array' THEN {column} END END, '[]')")
+
+def _index_statements(row, friends_column):
+    """画像1件分のフレンドをインデックスに追加するSQL"""
+    source = _friends_source(friends_column)
+    return f"""
+            INSERT OR IGNORE INTO friends (name)
+            SELECT DISTINCT trim(value) FROM json_each({source})
+            WHERE type = 'text' AND trim(value) <> '';
+            INSERT OR IGNORE INTO image_friends (friend_id, image_id)
+            SELECT f.id, {row}.id FROM json_each({source}) AS j
+            JOIN friends AS f ON f.name = trim(j.value)
+            WHERE j.type = 'text';
+            INSERT INTO friend_pairs (friend_a, friend_b, count)
+            SELECT a.friend_id, b.friend_id, 1 FROM image_friends AS a
+            JOIN image_friends AS b ON b.image_id = a.image_id AND a.friend_id < b.friend_id
+            WHERE a.image_id = {row}.id
+            ON CONFLICT(friend_a, friend_b) DO UPDATE SET count = count + 1;"""
+
+def _unindex_statements(row):
+    """画像1件分のフレンドをインデックスから取り除くSQL"""
+    pairs = f"""(SELECT a.friend_id, b.friend_id FROM image_friends AS a
+                JOIN image_friends AS b ON b.image_id = a.image_id AND a.friend_id < b.friend_id
+                WHERE a.image_id = {row}.id)"""
+    return f"""
+            UPDATE friend_pairs SET count = count - 1
+            WHERE (friend_a, friend_b) IN {pairs};
+            DELETE FROM friend_pairs
+            WHERE (friend_a, friend_b) IN {pairs} AND count <= 0;
+            DELETE FROM image_friends WHERE image_id = {row}.id;"""
+
+# image_metadataへの書き込みに追従してインデックスを更新するトリガー
+FRIEND_INDEX_TRIGGERS = {
+    'trg_friend_index_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_friend_index_insert
+        AFTER INSERT ON image_metadata
+        BEGIN{_index_statements('NEW', 'NEW.friends')}
+        END
+    """,
+    'trg_friend_index_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_friend_index_delete
+        AFTER DELETE ON image_metadata
+        BEGIN{_unindex_statements('OLD')}
+        END
+    """,
+    'trg_friend_index_update': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_friend_index_update
+        AFTER UPDATE OF friends ON image_metadata
+        WHEN OLD.friends IS NOT NEW.friends
+        BEGIN{_unindex_statements('OLD')}{_index_statements('NEW', 'NEW.friends')}
+        END
+    """,
+}
+
+# 既存の画像からフレンドインデックスを作り直すSQL
+_REBUILD_SOURCE = _friends_source('m.friends')
+FRIEND_INDEX_REBUILD_SQL = [
+    "DELETE FROM friend_pairs",
+    "DELETE FROM image_friends",
+    f"""
+        INSERT OR IGNORE INTO friends (name)
+        SELECT DISTINCT trim(j.value) FROM image_metadata AS m, json_each({_REBUILD_SOURCE}) AS j
+        WHERE j.type = 'text' AND trim(j.value) <> ''
+    """,
+    f"""
+        INSERT OR IGNORE INTO image_friends (friend_id, image_id)
+        SELECT f.id, m.id FROM image_metadata AS m, json_each({_REBUILD_SOURCE}) AS j
+        JOIN friends AS f ON f.name = trim(j.value)
+        WHERE j.type = 'text'
+    """,
+    """
+        INSERT INTO friend_pairs (friend_a, friend_b, count)
+        SELECT a.friend_id, b.friend_id, COUNT(*) FROM image_friends AS a
+        JOIN image_friends AS b ON b.image_id = a.image_id AND a.friend_id < b.friend_id
+        GROUP BY a.friend_id, b.friend_id
+    """,
+]
+
+# 指定した画像IDの範囲（:lo < image_id <= :hi）のインデックスだけを作り直すSQL
+FRIEND_INDEX_REBUILD_RANGE_SQL = [
+    "DELETE FROM image_friends WHERE image_id > :lo AND image_id <= :hi",
+    f"""
+        INSERT OR IGNORE INTO friends (name)
+        SELECT DISTINCT trim(j.value) FROM image_metadata AS m, json_each({_REBUILD_SOURCE}) AS j
+        WHERE m.id > :lo AND m.id <= :hi AND j.type = 'text' AND trim(j.value) <> ''
+    """,
+    f"""
+        INSERT OR IGNORE INTO image_friends (friend_id, image_id)
+        SELECT f.id, m.id FROM image_metadata AS m, json_each({_REBUILD_SOURCE}) AS j
+        JOIN friends AS f ON f.name = trim(j.value)
+        WHERE m.id > :lo AND m.id <= :hi AND j.type = 'text'
+    """,
+]
+
+# 指定したフレンドIDの範囲（:lo < friend_a <= :hi）の組み合わせだけを数え直すSQL
+# （image_friendsをすべて作り直した後に実行する）
+FRIEND_PAIRS_REBUILD_RANGE_SQL = [
+    "DELETE FROM friend_pairs WHERE friend_a > :lo AND friend_a <= :hi",
+    """
+        INSERT INTO friend_pairs (friend_a, friend_b, count)
+        SELECT a.friend_id, b.friend_id, COUNT(*) FROM image_friends AS a
+        JOIN image_friends AS b ON b.image_id = a.image_id AND a.friend_id < b.friend_id
+        WHERE a.friend_id > :lo AND a.friend_id <= :hi
+        GROUP BY a.friend_id, b.friend_id
+    """,
+]
@@ -14,7 +14,7 @@ class ImageMetadata(Base):
     world_name = Column(String(255))  # VRChatワールド名
     username = Column(String(256))  # ユーザー名（撮影者）
     friends = Column(Text)  # フレンド情報をJSON形式で保存
-    capture_time = Column(DateTime)  # 撮影時刻
+    capture_time = Column(DateTime, index=True)  # 撮影時刻
     created_at = Column(DateTime, default=datetime.now)  # レコード作成日時
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # 更新日時
     tags = Column(Text)  # タグ情報をJSON形式で保存
@@ -57,4 +57,75 @@ class ImageMetadata(Base):
             'tags': json.loads(self.tags) if self.tags else [],
             'rating': self.rating
         }
-        return result
\ No newline at end of file
+        return result
+
+class CaptureDateCount(Base):
+    """撮影日ごとの画像枚数（タイムライン表示用の集計テーブル）"""
+    __tablename__ = 'capture_date_counts'
+
+    day = Column(String(10), primary_key=True)  # 撮影日（YYYY-MM-DD）
+    count = Column(Integer, nullable=False, default=0)  # 画像枚数
+
+    def to_dict(self):
+        """モデルをJSON変換可能な辞書形式に変換"""
+        return {'day': self.day, 'count': self.count}
+
+# capture_date_countsをimage_metadataへの書き込みに追従させるトリガー
+# SQLiteのDateTimeは'YYYY-MM-DD HH:MM:SS.ffffff'形式の文字列なので先頭10文字が日付
+CAPTURE_DATE_TRIGGERS = {
+    'trg_capture_date_insert': """
+        CREATE TRIGGER IF NOT EXISTS trg_capture_date_insert
+        AFTER INSERT ON image_metadata WHEN NEW.capture_time IS NOT NULL
+        BEGIN
+            INSERT INTO capture_date_counts (day, count)
+            VALUES (substr(NEW.capture_time, 1, 10), 1)
+            ON CONFLICT(day) DO UPDATE SET count = count + 1;
+        END
+    """,
+    'trg_capture_date_delete': """
+        CREATE TRIGGER IF NOT EXISTS trg_capture_date_delete
+        AFTER DELETE ON image_metadata WHEN OLD.capture_time IS NOT NULL
+        BEGIN
+            UPDATE capture_date_counts SET count = count - 1
+            WHERE day = substr(OLD.capture_time, 1, 10);
+            DELETE FROM capture_date_counts
+            WHERE day = substr(OLD.capture_time, 1, 10) AND count <= 0;
+        END
+    """,
+    'trg_capture_date_update': """
+        CREATE TRIGGER IF NOT EXISTS trg_capture_date_update
+        AFTER UPDATE OF capture_time ON image_metadata
+        WHEN OLD.capture_time IS NOT NEW.capture_time
+        BEGIN
+            UPDATE capture_date_counts SET count = count - 1
+            WHERE day = substr(OLD.capture_time, 1, 10);
+            DELETE FROM capture_date_counts
+            WHERE day = substr(OLD.capture_time, 1, 10) AND count <= 0;
+            INSERT INTO capture_date_counts (day, count)
+            SELECT substr(NEW.capture_time, 1, 10), 1 WHERE NEW.capture_time IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET count = count + 1;
+        END
+    """,
+}
+
+# 既存データから集計テーブルを作り直すSQL
+CAPTURE_DATE_REBUILD_SQL = [
+    "DELETE FROM capture_date_counts",
+    """
+        INSERT INTO capture_date_counts (day, count)
+        SELECT substr(capture_time, 1, 10), COUNT(*) FROM image_metadata
+        WHERE capture_time IS NOT NULL GROUP BY substr(capture_time, 1, 10)
+    """,
+]
+
+# 指定した期間（:lo <= day < :hi）の集計だけを作り直すSQL（再インデックスをバッチで行う場合に使う）
+# 期間内の件数は画像から数え直すので、バッチの間にトリガーで更新されていても正しい値になる
+CAPTURE_DATE_REBUILD_RANGE_SQL = [
+    "DELETE FROM capture_date_counts WHERE day >= :lo AND day < :hi",
+    """
+        INSERT INTO capture_date_counts (day, count)
+        SELECT substr(capture_time, 1, 10), COUNT(*) FROM image_metadata
+        WHERE capture_time >= :lo AND capture_time < :hi
+        GROUP BY substr(capture_time, 1, 10)
+    """,
+]
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
+from models import Base
+
+# ジョブの状態
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+class Job(Base):
+    """バックグラウンドジョブを格納するテーブルモデル"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        Index('ix_jobs_status_priority', 'status', 'priority'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String(50), nullable=False)  # ジョブの種類（export, sync_settingsなど）
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)  # 状態
+    priority = Column(Integer, nullable=False, default=0)  # 優先度（大きいほど先に実行）
+    params = Column(Text)  # 引数をJSON形式で保存
+    progress_current = Column(Integer, nullable=False, default=0)  # 処理済み件数
+    progress_total = Column(Integer)  # 全体の件数（不明ならNULL）
+    message = Column(Text)  # 進捗メッセージ
+    result = Column(Text)  # 結果をJSON形式で保存
+    error = Column(Text)  # エラーメッセージ
+    cancel_requested = Column(Boolean, nullable=False, default=False)  # キャンセル要求
+    created_at = Column(DateTime, default=datetime.now)  # 登録日時
+    started_at = Column(DateTime)  # 開始日時
+    finished_at = Column(DateTime)  # 終了日時
+
+    def get_params(self):
+        """JSON形式の引数を解析して返す"""
+        return json.loads(self.params) if self.params else {}
+
+    def to_dict(self):
+        """モデルをJSON変換可能な辞書形式に変換"""
+        progress = None
+        eta_seconds = None
+        if self.progress_total:
+            progress = min(self.progress_current / self.progress_total, 1.0)
+            # 経過時間と進捗率から残り時間を推定
+            if self.status == JOB_RUNNING and self.started_at and 0 < progress < 1:
+                elapsed = (datetime.now() - self.started_at).total_seconds()
+                eta_seconds = round(elapsed / progress * (1 - progress), 1)
+
+        return {
+            'id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'priority': self.priority,
+            'params': self.get_params(),
+            'progress': {
+                'current': self.progress_current,
+                'total': self.progress_total,
+                'ratio': progress,
+                'eta_seconds': eta_seconds,
+                'message': self.message
+            },
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,105 @@
+import sqlite3
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
+from models import Base
+from models.image import CAPTURE_DATE_TRIGGERS, CAPTURE_DATE_REBUILD_SQL
+from models.friend import FRIEND_INDEX_TRIGGERS, FRIEND_INDEX_REBUILD_SQL
+from models.job import Job
+from models import settings  # create_allの対象に含めるため読み込む
+
+def get_columns(conn, table):
+    """テーブルの列名一覧を取得"""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def add_column_if_missing(conn, table, column, column_type):
+    """列が無ければ追加（create_allで作られた新規DBでは何もしない）"""
+    if column not in get_columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+def add_username_column(conn):
+    add_column_if_missing(conn, 'image_metadata', 'username', 'TEXT')
+
+def add_tags_rating_columns(conn):
+    add_column_if_missing(conn, 'image_metadata', 'tags', 'TEXT')
+    add_column_if_missing(conn, 'image_metadata', 'rating', 'INTEGER')
+
+def add_capture_date_rollup(conn):
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_image_metadata_capture_time "
+        "ON image_metadata (capture_time)"
+    )
+    for ddl in CAPTURE_DATE_TRIGGERS.values():
+        conn.execute(ddl)
+    for sql in CAPTURE_DATE_REBUILD_SQL:
+        conn.execute(sql)
+
+def add_friend_index(conn):
+    for ddl in FRIEND_INDEX_TRIGGERS.values():
+        conn.execute(ddl)
+    for sql in FRIEND_INDEX_REBUILD_SQL:
+        conn.execute(sql)
+
+def create_table(conn, model):
+    """モデル定義からテーブルとインデックスを作成（既にあれば何もしない）"""
+    dialect = sqlite.dialect()
+    conn.execute(str(CreateTable(model.__table__, if_not_exists=True).compile(dialect=dialect)))
+    for index in model.__table__.indexes:
+        conn.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect)))
+
+def add_jobs_table(conn):
+    create_table(conn, Job)
+
+# (バージョン, 説明, 適用関数) の順序付きリスト
+# 末尾に追加するだけにし、適用済みのステップは変更しないこと
+# スキーマが最新ならcreate_allは実行されないので、新しいテーブルもここで作成する
+MIGRATIONS = [
+    (1, 'image_metadataにusername列を追加', add_username_column),
+    (2, 'image_metadataにtags/rating列を追加', add_tags_rating_columns),
+    (3, '撮影日集計テーブルとcapture_timeインデックスを追加', add_capture_date_rollup),
+    (4, 'フレンド共起インデックスを追加', add_friend_index),
+    (5, 'バックグラウンドジョブのjobsテーブルを追加', add_jobs_table),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """PRAGMA user_versionからスキーマバージョンを取得"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(engine):
+    """
+    未適用のマイグレーションを順番に適用する
+
+    スキーマが最新の場合はPRAGMA user_versionを1回読むだけで終わる。
+    各ステップはバージョン更新と同じトランザクションで実行されるので、
+    途中で失敗してもそのステップは適用前の状態に戻る
+
+    Returns:
+        int: 適用後のスキーマバージョン
+    """
+    # pysqliteの暗黙トランザクションはDDLを含まないので、自前でBEGIN/COMMITする
+    conn = sqlite3.connect(engine.url.database, isolation_level=None)
+    try:
+        version = get_schema_version(conn)
+        if version >= LATEST_VERSION:
+            return version
+
+        # 新規DBや新しいモデルのテーブルを作成してから列・インデックスを追加
+        Base.metadata.create_all(engine)
+
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            print(f"マイグレーション {number} を適用しました: {description}")
+            version = number
+        return version
+    finally:
+        conn.close()
@@ -1,9 +1,13 @@
 from routes.images import images_bp
 from routes.settings import settings_bp
 from routes.sync import sync_bp
+from routes.maintenance import maintenance_bp
+from routes.jobs import jobs_bp
 
 def register_routes(app):
     """アプリケーションにすべてのルートを登録"""
     app.register_blueprint(images_bp, url_prefix='/api/images')
     app.register_blueprint(settings_bp, url_prefix='/api/settings')
-    app.register_blueprint(sync_bp, url_prefix='/api/sync')
\ No newline at end of file
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    app.register_blueprint(maintenance_bp, url_prefix='/api/maintenance')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
\ No newline at end of file
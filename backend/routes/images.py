@@ -1,13 +1,29 @@
 from flask import Blueprint, jsonify, request, current_app
-from services.image_service import get_images, get_image_metadata_by_id, export_images
+from utils.response_cache import cached_response
+from utils.response_format import (
+    negotiate_mimetype, make_columnar_response, compress_response, MIMETYPE_JSON
+)
+from routes.jobs import submit_job_response
+from services.friend_service import get_top_companions, get_images_with_friends
+from services.image_service import (
+    get_images, get_image_rows, get_image_metadata_by_id, export_images,
+    get_images_metadata_by_ids, update_images_tags_rating,
+    get_timeline, backfill_capture_times, TIMELINE_GRANULARITIES
+)
 
 # Blueprint作成（ルートのグループ化）
 images_bp = Blueprint('images', __name__)
 
 @images_bp.route('/', methods=['GET'])
+@cached_response
 def list_images():
-    """画像一覧を取得・検索するAPI"""
+    """画像一覧を取得・検索するAPI（Accept/?format=で列形式JSON・MessagePackも返す）"""
     try:
+        # レスポンス形式（指定が無ければ従来のJSON）
+        mimetype = negotiate_mimetype()
+        if mimetype is None:
+            return jsonify({'success': False, 'error': 'Unsupported format'}), 406
+        
         # クエリパラメータから検索条件を取得
         world_name = request.args.get('world_name')
         friend_name = request.args.get('friend_name')
@@ -15,19 +31,146 @@ def list_images():
         date_from = request.args.get('date_from')
         date_to = request.args.get('date_to')
         
-        # サービスレイヤーの関数を呼び出して検索 servicesに送る
-        images = get_images(
+        search_params = dict(
             world_name=world_name, 
             friend_name=friend_name,
             username=username,  # ユーザー名パラメータを渡す 
             date_from=date_from, 
             date_to=date_to
         )
-        return jsonify({'success': True, 'images': images})
+        
+        # 列形式はキーを繰り返さないので、大量の結果でも小さく速い
+        if mimetype != MIMETYPE_JSON:
+            columns, rows = get_image_rows(**search_params)
+            return make_columnar_response(mimetype, columns, rows, {'success': True})
+        
+        # サービスレイヤーの関数を呼び出して検索 servicesに送る
+        images = get_images(**search_params)
+        response = jsonify({'success': True, 'images': images})
+        response.vary.add('Accept')
+        return compress_response(response)
     except Exception as e:
         # エラーが発生した場合はエラーレスポンスを返す
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def parse_image_ids(data):
+    """リクエストボディから画像IDリストを取り出す（不正な場合はNone）"""
+    image_ids = data.get('ids')
+    if not isinstance(image_ids, list):
+        return None
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in image_ids):
+        return None
+    return list(dict.fromkeys(image_ids))
+
+@images_bp.route('/', methods=['PATCH'], strict_slashes=False)
+def bulk_update_images():
+    """複数画像のタグ・評価を一括更新するAPI"""
+    try:
+        data = request.get_json(silent=True) or {}
+        image_ids = parse_image_ids(data)
+        if image_ids is None:
+            return jsonify({'success': False, 'error': 'ids must be a list of integers'}), 400
+
+        add_tags = data.get('add_tags', [])
+        remove_tags = data.get('remove_tags', [])
+        for tags in (add_tags, remove_tags):
+            if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+                return jsonify({'success': False, 'error': 'Tags must be a list of strings'}), 400
+
+        # ratingキーがある場合のみ評価を変更（nullで評価を削除）
+        update_rating = 'rating' in data
+        rating = data.get('rating')
+        if rating is not None and (not isinstance(rating, int) or isinstance(rating, bool)
+                                   or not 1 <= rating <= 5):
+            return jsonify({'success': False, 'error': 'rating must be an integer from 1 to 5'}), 400
+
+        result = update_images_tags_rating(
+            image_ids,
+            add_tags=add_tags,
+            remove_tags=remove_tags,
+            rating=rating,
+            update_rating=update_rating,
+            write_back=bool(data.get('write_back', False))
+        )
+        return jsonify({'success': True, 'result': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/metadata:batch', methods=['POST'])
+def batch_metadata():
+    """複数画像のメタデータをまとめて取得するAPI"""
+    try:
+        data = request.get_json(silent=True) or {}
+        image_ids = parse_image_ids(data)
+        if image_ids is None:
+            return jsonify({'success': False, 'error': 'ids must be a list of integers'}), 400
+
+        images, missing = get_images_metadata_by_ids(image_ids)
+        return jsonify({'success': True, 'images': images, 'missing': missing})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/friends/companions', methods=['GET'])
+@cached_response
+def friend_companions():
+    """指定したフレンドと一緒に写っていることが多いフレンドを取得するAPI"""
+    try:
+        friend = request.args.get('friend')
+        if not friend:
+            return jsonify({'success': False, 'error': 'friend is required'}), 400
+        limit = request.args.get('limit', 10, type=int)
+
+        companions = get_top_companions(friend, limit=max(1, min(limit, 100)))
+        if companions is None:
+            return jsonify({'success': False, 'error': 'Friend not found'}), 404
+        return jsonify({'success': True, 'friend': friend, 'companions': companions})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/friends/together', methods=['GET'])
+@cached_response
+def friends_together():
+    """指定したフレンド全員が写っている画像を取得するAPI（?friend=A&friend=B）"""
+    try:
+        friends = [name for name in request.args.getlist('friend') if name]
+        if not friends:
+            return jsonify({'success': False, 'error': 'At least one friend is required'}), 400
+
+        images = get_images_with_friends(friends)
+        return jsonify({'success': True, 'images': images})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/timeline', methods=['GET'])
+@cached_response
+def timeline():
+    """撮影日ごと・月ごとの画像枚数を取得するAPI"""
+    try:
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in TIMELINE_GRANULARITIES:
+            return jsonify({'success': False, 'error': 'granularity must be day or month'}), 400
+
+        periods = get_timeline(granularity)
+        return jsonify({'success': True, 'granularity': granularity, 'timeline': periods})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/capture-time/backfill', methods=['POST'])
+def capture_time_backfill():
+    """撮影時刻が未設定の画像を一括補完するAPI"""
+    try:
+        data = request.get_json(silent=True) or {}
+        overwrite = bool(data.get('overwrite', False))
+        
+        # async指定時はジョブとして登録し、すぐに応答する
+        if data.get('async'):
+            return submit_job_response('backfill_capture_time', {'overwrite': overwrite}, data)
+        
+        result = backfill_capture_times(overwrite=overwrite)
+        return jsonify({'success': True, 'result': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @images_bp.route('/<int:image_id>/metadata', methods=['GET'])
 def image_metadata(image_id):
     """特定画像のメタデータを取得するAPI"""
@@ -52,6 +195,11 @@ def export():
         if not target_folder:
             return jsonify({'success': False, 'error': 'Target folder is required'}), 400
             
+        # async指定時はジョブとして登録し、すぐに応答する
+        if data.get('async'):
+            return submit_job_response(
+                'export', {'image_ids': image_ids, 'target_folder': target_folder}, data)
+            
         # エクスポート処理を実行
         result = export_images(image_ids, target_folder)
         return jsonify({'success': True, 'result': result})
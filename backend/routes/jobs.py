@@ -0,0 +1,81 @@
+from flask import Blueprint, jsonify, request, Response
+from services.job_service import (
+    submit_job, get_job, list_jobs, cancel_job, stream_job_events, get_job_types
+)
+import services.job_handlers  # ジョブの処理関数を登録する
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def submit_job_response(job_type, params, data):
+    """
+    リクエストの優先度を検証してジョブを登録し、APIのレスポンスを返す
+
+    Args:
+        job_type: ジョブの種類
+        params: 処理関数に渡す引数
+        data: リクエストのJSON（priorityを含む）
+
+    Returns:
+        tuple: (レスポンス, ステータスコード) 優先度が整数でなければ400
+    """
+    priority = data.get('priority', 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        return jsonify({'success': False, 'error': 'priority must be an integer'}), 400
+
+    job = submit_job(job_type, params, priority=priority)
+    return jsonify({'success': True, 'job': job}), 202
+
+@jobs_bp.route('/', methods=['GET'])
+def get_jobs():
+    """ジョブ一覧を取得するAPI"""
+    try:
+        status = request.args.get('status')
+        limit = request.args.get('limit', 50, type=int)
+        jobs = list_jobs(status=status, limit=max(1, min(limit, 500)))
+        return jsonify({'success': True, 'jobs': jobs})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/', methods=['POST'])
+def create_job():
+    """ジョブを登録するAPI"""
+    try:
+        data = request.get_json(silent=True) or {}
+        job_type = data.get('type')
+        if job_type not in get_job_types():
+            return jsonify({'success': False, 'error': f'type must be one of {get_job_types()}'}), 400
+        params = data.get('params', {})
+        if not isinstance(params, dict):
+            return jsonify({'success': False, 'error': 'params must be an object'}), 400
+        return submit_job_response(job_type, params, data)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+def job_detail(job_id):
+    """ジョブの状態・進捗を取得するAPI"""
+    try:
+        job = get_job(job_id)
+        if job:
+            return jsonify({'success': True, 'job': job})
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/<int:job_id>/cancel', methods=['POST'])
+def job_cancel(job_id):
+    """ジョブをキャンセルするAPI"""
+    try:
+        job = cancel_job(job_id)
+        if job:
+            return jsonify({'success': True, 'job': job})
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/<int:job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """ジョブの進捗をServer-Sent Eventsで送るAPI"""
+    response = Response(stream_job_events(job_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify, request, current_app
+from utils.db_maintenance import create_snapshot, list_snapshots, optimize_database
+
+maintenance_bp = Blueprint('maintenance', __name__)
+
+@maintenance_bp.route('/snapshots', methods=['GET'])
+def get_snapshots():
+    """スナップショット一覧を取得するAPI"""
+    try:
+        snapshots = list_snapshots(current_app.config['SNAPSHOT_DIR'])
+        return jsonify({'success': True, 'snapshots': snapshots})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@maintenance_bp.route('/snapshots', methods=['POST'])
+def snapshot():
+    """稼働中のデータベースのスナップショットを作成するAPI"""
+    try:
+        result = create_snapshot(
+            current_app.config['DB_PATH'],
+            current_app.config['SNAPSHOT_DIR'],
+            current_app.config.get('SNAPSHOT_RETENTION')
+        )
+        return jsonify({'success': True, 'result': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@maintenance_bp.route('/optimize', methods=['POST'])
+def optimize():
+    """ANALYZE / PRAGMA optimize / VACUUM INTO を実行するAPI"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = optimize_database(
+            current_app.config['DB_PATH'],
+            vacuum_into=data.get('vacuum_into'),
+            analyze=bool(data.get('analyze', True))
+        )
+        return jsonify({'success': True, 'result': result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
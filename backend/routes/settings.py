@@ -1,10 +1,12 @@
 from flask import Blueprint, jsonify, request, current_app
+from utils.response_cache import cached_response
 from services.settings_service import get_all_settings, get_setting_by_key, update_setting
 
 # Blueprint作成
 settings_bp = Blueprint('settings', __name__)
 
 @settings_bp.route('/', methods=['GET'])
+@cached_response
 def get_settings():
     """すべての設定を取得するAPI"""
     try:
@@ -14,6 +16,7 @@ def get_settings():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @settings_bp.route('/<string:key>', methods=['GET'])
+@cached_response
 def get_setting(key):
     """特定の設定キーの値を取得するAPI"""
     try:
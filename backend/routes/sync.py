@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, current_app
 from services.sync_service import sync_settings_from_json, get_sync_status
+from routes.jobs import submit_job_response
 
 sync_bp = Blueprint('sync', __name__)
 
@@ -11,6 +12,10 @@ def sync_settings():
         data = request.json or {}
         json_path = data.get('json_path')
         
+        # async指定時はジョブとして登録し、すぐに応答する
+        if data.get('async'):
+            return submit_job_response('sync_settings', {'json_path': json_path}, data)
+        
         # 同期処理を実行
         result = sync_settings_from_json(json_path)
         return jsonify(result)
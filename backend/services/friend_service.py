@@ -0,0 +1,114 @@
+from flask import current_app, g
+from sqlalchemy import func, or_, case
+from sqlalchemy.orm import aliased
+from models.image import ImageMetadata
+from models.friend import (
+    Friend, ImageFriend, FriendPair, FRIEND_INDEX_REBUILD_RANGE_SQL, FRIEND_PAIRS_REBUILD_RANGE_SQL
+)
+
+# 再インデックスで1トランザクションに含める画像数の目安
+REBUILD_BATCH_SIZE = 2000
+
+# SQLiteの整数の最大値（最後の範囲をここまでにして範囲外に残った行も削除する）
+SQLITE_MAX_INTEGER = 2 ** 63 - 1
+
+def get_db_session():
+    """データベースセッションを取得（ジョブ実行中はワーカー専用のセッション）"""
+    if 'db_session' in g:
+        return g.db_session
+    return current_app.config['DB_SESSION']
+
+def get_friend_ids(session, names):
+    """フレンド名からIDを取得（見つからない名前はNone）"""
+    rows = session.query(Friend.name, Friend.id).filter(Friend.name.in_(names)).all()
+    found = dict(rows)
+    return {name: found.get(name) for name in names}
+
+def get_top_companions(friend_name, limit=10):
+    """指定したフレンドと一緒に写っている回数が多いフレンドを取得"""
+    session = get_db_session()
+    friend_id = get_friend_ids(session, [friend_name])[friend_name]
+    if friend_id is None:
+        return None
+
+    # 組み合わせはfriend_a < friend_bで保存されているので相手側のIDを取り出す
+    companion_id = case((FriendPair.friend_a == friend_id, FriendPair.friend_b),
+                        else_=FriendPair.friend_a)
+    pairs = (session.query(companion_id.label('companion_id'), FriendPair.count)
+             .filter(or_(FriendPair.friend_a == friend_id, FriendPair.friend_b == friend_id))
+             .subquery())
+    rows = (session.query(Friend.name, pairs.c.count)
+            .join(pairs, Friend.id == pairs.c.companion_id)
+            .order_by(pairs.c.count.desc(), Friend.name)
+            .limit(limit)
+            .all())
+    return [{'name': name, 'count': count} for name, count in rows]
+
+def get_images_with_friends(friend_names):
+    """指定したフレンド全員が写っている画像を取得"""
+    session = get_db_session()
+    friend_ids = get_friend_ids(session, friend_names)
+    if not friend_ids or None in friend_ids.values():
+        return []
+
+    # 画像数が少ないフレンドのポスティングリストから順に突き合わせる
+    sizes = dict(session.query(ImageFriend.friend_id, func.count())
+                 .filter(ImageFriend.friend_id.in_(friend_ids.values()))
+                 .group_by(ImageFriend.friend_id)
+                 .all())
+    ordered_ids = sorted(set(friend_ids.values()), key=lambda i: sizes.get(i, 0))
+    if sizes.get(ordered_ids[0], 0) == 0:
+        return []
+
+    base = aliased(ImageFriend)
+    query = session.query(base.image_id).filter(base.friend_id == ordered_ids[0])
+    for friend_id in ordered_ids[1:]:
+        other = aliased(ImageFriend)
+        query = query.join(other, (other.image_id == base.image_id) & (other.friend_id == friend_id))
+    matched = query.subquery()
+
+    images = (session.query(ImageMetadata)
+              .filter(ImageMetadata.id.in_(matched.select()))
+              .order_by(ImageMetadata.capture_time.desc(), ImageMetadata.id.desc())
+              .all())
+    return [image.to_dict() for image in images]
+
+def get_friend_index_rebuild_batches(batch_size=REBUILD_BATCH_SIZE):
+    """
+    画像ごとのフレンドインデックスを画像IDの範囲ごとに作り直すバッチの一覧を作成
+
+    Returns:
+        list: (SQLのリスト, パラメータ) のリスト（1件ずつ別のトランザクションで実行する）
+    """
+    session = get_db_session()
+    max_image_id = session.query(func.max(ImageMetadata.id)).scalar() or 0
+    bounds = list(range(0, max_image_id, batch_size)) or [0]
+    bounds.append(SQLITE_MAX_INTEGER)
+    return [(FRIEND_INDEX_REBUILD_RANGE_SQL, {'lo': lo, 'hi': hi})
+            for lo, hi in zip(bounds, bounds[1:])]
+
+def get_friend_pairs_rebuild_batches(batch_size=REBUILD_BATCH_SIZE):
+    """
+    フレンドの組み合わせをフレンドIDの範囲ごとに数え直すバッチの一覧を作成
+
+    画像ごとのインデックスを作り直した後に呼び出し、写っている画像数の合計が
+    batch_sizeごとになるように区切る
+
+    Returns:
+        list: (SQLのリスト, パラメータ) のリスト（1件ずつ別のトランザクションで実行する）
+    """
+    session = get_db_session()
+    sizes = (session.query(ImageFriend.friend_id, func.count())
+             .group_by(ImageFriend.friend_id)
+             .order_by(ImageFriend.friend_id)
+             .all())
+    bounds = [0]
+    postings = 0
+    for friend_id, count in sizes:
+        postings += count
+        if postings >= batch_size:
+            bounds.append(friend_id)
+            postings = 0
+    bounds.append(SQLITE_MAX_INTEGER)
+    return [(FRIEND_PAIRS_REBUILD_RANGE_SQL, {'lo': lo, 'hi': hi})
+            for lo, hi in zip(bounds, bounds[1:])]
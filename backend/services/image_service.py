@@ -2,21 +2,37 @@ import os
 import json
 import shutil
 from datetime import datetime
-from flask import current_app
-from sqlalchemy import and_, or_
+from flask import current_app, g
+from sqlalchemy import and_, or_, func, update, select
 from models import Session
-from models.image import ImageMetadata
+from models.image import ImageMetadata, CaptureDateCount, CAPTURE_DATE_REBUILD_RANGE_SQL
+from models.settings import Settings
+from utils.capture_time import extract_capture_time, DEFAULT_RENAME_FORMATS
+from utils.png_metadata import write_png_metadata, png_write_lock
+from services.job_service import submit_job
+
+# タイムラインの集計単位 -> 日付文字列の先頭何文字を使うか
+TIMELINE_GRANULARITIES = {'day': 10, 'month': 7}
+
+# PNG書き戻しジョブの優先度（対話的に登録されたジョブより後）
+WRITE_BACK_PRIORITY = -10
 
 def get_db_session():
-    """データベースセッションを取得"""
+    """データベースセッションを取得（ジョブ実行中はワーカー専用のセッション）"""
+    if 'db_session' in g:
+        return g.db_session
     return current_app.config['DB_SESSION']
 
-#images.pyから受け取ったimage_dataを使って検索を行う 検索方式はORMを使う
-def get_images(world_name=None, friend_name=None, username=None, date_from=None, date_to=None):
-    """条件に基づいて画像を検索"""
-    session = get_db_session()
-    query = session.query(ImageMetadata)
-    
+# 列形式レスポンスの列（ImageMetadata.to_dictと同じ順序・値）
+IMAGE_COLUMNS = [
+    'id', 'file_path', 'file_name', 'world_id', 'world_name', 'username',
+    'friends', 'capture_time', 'created_at', 'updated_at', 'tags', 'rating'
+]
+_JSON_COLUMNS = {'friends', 'tags'}
+_DATETIME_COLUMNS = {'capture_time', 'created_at', 'updated_at'}
+
+def filter_images(query, world_name=None, friend_name=None, username=None, date_from=None, date_to=None):
+    """検索条件をクエリに適用"""
     # 検索条件を適用
     if world_name:
         query = query.filter(ImageMetadata.world_name.like(f'%{world_name}%'))
@@ -44,11 +60,47 @@ def get_images(world_name=None, friend_name=None, username=None, date_from=None,
         except ValueError:
             pass
     
+    return query
+
+#images.pyから受け取ったimage_dataを使って検索を行う 検索方式はORMを使う
+def get_images(world_name=None, friend_name=None, username=None, date_from=None, date_to=None):
+    """条件に基づいて画像を検索"""
+    session = get_db_session()
+    query = filter_images(session.query(ImageMetadata), world_name, friend_name,
+                          username, date_from, date_to)
+    
     # 結果を取得
     results = query.all()
     # 辞書に変換してリスト化
     return [image.to_dict() for image in results]
 
+def get_image_rows(world_name=None, friend_name=None, username=None, date_from=None, date_to=None):
+    """
+    条件に基づいて画像を検索し、列名リストと行（値のリスト）で返す
+
+    ORMオブジェクトや行ごとの辞書を作らないので、大量の結果でも軽い
+
+    Returns:
+        tuple: (IMAGE_COLUMNS, 行のリスト)
+    """
+    session = get_db_session()
+    entities = [getattr(ImageMetadata, column) for column in IMAGE_COLUMNS]
+    query = filter_images(session.query(*entities), world_name, friend_name,
+                          username, date_from, date_to)
+
+    json_indexes = [i for i, column in enumerate(IMAGE_COLUMNS) if column in _JSON_COLUMNS]
+    datetime_indexes = [i for i, column in enumerate(IMAGE_COLUMNS) if column in _DATETIME_COLUMNS]
+
+    rows = []
+    for result in query.all():
+        row = list(result)
+        for i in json_indexes:
+            row[i] = json.loads(row[i]) if row[i] else []
+        for i in datetime_indexes:
+            row[i] = row[i].isoformat() if row[i] else None
+        rows.append(row)
+    return IMAGE_COLUMNS, rows
+
 def get_image_metadata_by_id(image_id):
     """画像IDからメタデータを取得"""
     session = get_db_session()
@@ -57,8 +109,123 @@ def get_image_metadata_by_id(image_id):
         return image.to_dict()
     return None
 
-def export_images(image_ids, target_folder):
-    """画像をエクスポート"""
+def ids_filter(image_ids):
+    """ID一覧の絞り込み条件（件数に関係なく1つのJSONパラメータで渡す）"""
+    id_values = func.json_each(json.dumps([int(i) for i in image_ids])).table_valued('value')
+    return ImageMetadata.id.in_(select(id_values.c.value))
+
+def get_images_metadata_by_ids(image_ids):
+    """
+    複数の画像IDのメタデータを1回のクエリで取得
+
+    Returns:
+        tuple: (リクエスト順のメタデータリスト, 見つからなかったIDのリスト)
+    """
+    session = get_db_session()
+    images = session.query(ImageMetadata).filter(ids_filter(image_ids)).all()
+    found = {image.id: image.to_dict() for image in images}
+
+    ordered = [found[image_id] for image_id in image_ids if image_id in found]
+    missing = [image_id for image_id in image_ids if image_id not in found]
+    return ordered, missing
+
+def update_images_tags_rating(image_ids, add_tags=None, remove_tags=None,
+                              rating=None, update_rating=False, write_back=False):
+    """
+    複数画像のタグ追加・削除と評価変更を1トランザクションでまとめて行う
+
+    Args:
+        image_ids: 対象の画像IDリスト
+        add_tags: 追加するタグのリスト
+        remove_tags: 削除するタグのリスト
+        rating: 設定する評価（Noneで評価を削除）
+        update_rating: Trueの場合のみratingを反映する
+        write_back: PNGのテキストチャンクにもバックグラウンドで書き戻すか
+
+    Returns:
+        dict: 更新結果
+    """
+    add_tags = list(dict.fromkeys(add_tags or []))
+    remove_tags = set(remove_tags or [])
+
+    session = get_db_session()
+    rows = (session.query(ImageMetadata.id, ImageMetadata.tags, ImageMetadata.rating)
+            .filter(ids_filter(image_ids))
+            .all())
+
+    updates = []
+    changed_ids = []
+    for image_id, tags_json, current_rating in rows:
+        tags = json.loads(tags_json) if tags_json else []
+        new_tags = [tag for tag in tags if tag not in remove_tags]
+        new_tags += [tag for tag in add_tags if tag not in new_tags]
+        new_rating = rating if update_rating else current_rating
+
+        if new_tags == tags and new_rating == current_rating:
+            continue
+        updates.append({
+            'id': image_id,
+            'tags': json.dumps(new_tags, ensure_ascii=False) if new_tags else None,
+            'rating': new_rating,
+            'updated_at': datetime.now()
+        })
+        changed_ids.append(image_id)
+
+    try:
+        # 主キー指定のバルクUPDATE（executemany）
+        if updates:
+            session.execute(update(ImageMetadata), updates)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    write_back_job = None
+    if write_back and changed_ids:
+        # PNGへの書き戻しは対話的なリクエストより低い優先度でジョブとして実行
+        # （値は実行時にDBから読むので、引数は画像IDだけ）
+        write_back_job = submit_job('write_back_metadata', {'image_ids': changed_ids},
+                                    priority=WRITE_BACK_PRIORITY)
+
+    found = {row[0] for row in rows}
+    return {
+        'total': len(image_ids),
+        'updated': len(updates),
+        'unchanged': len(rows) - len(updates),
+        'missing': [image_id for image_id in image_ids if image_id not in found],
+        'write_back': bool(write_back_job),
+        'write_back_job_id': write_back_job['id'] if write_back_job else None
+    }
+
+def write_back_tags_rating(image_ids, progress=None):
+    """
+    タグと評価をPNGのテキストチャンクに書き戻す
+
+    書き込む値はファイルごとのロックを取ってからDBの現在の値を読むので、
+    同じ画像の書き戻しジョブが同時に実行されても古い値で上書きしない
+    """
+    session = get_db_session()
+    paths = session.query(ImageMetadata.id, ImageMetadata.file_path) \
+        .filter(ids_filter(image_ids)).all()
+
+    written = 0
+    for index, (image_id, file_path) in enumerate(paths):
+        if progress:
+            progress(index, len(paths))
+        if not file_path.lower().endswith('.png') or not os.path.exists(file_path):
+            continue
+        with png_write_lock(file_path):
+            row = session.query(ImageMetadata.tags, ImageMetadata.rating) \
+                .filter(ImageMetadata.id == image_id).first()
+            if row is None:
+                continue
+            tags = json.loads(row.tags) if row.tags else []
+            if write_png_metadata(file_path, {'Tags': tags if tags else None, 'Rating': row.rating}):
+                written += 1
+    return {'total': len(paths), 'written': written}
+
+def export_images(image_ids, target_folder, progress=None):
+    """画像をエクスポート（progress(処理済み件数, 全体の件数)で進捗を通知）"""
     if not os.path.exists(target_folder):
         os.makedirs(target_folder, exist_ok=True)
         
@@ -72,7 +239,9 @@ def export_images(image_ids, target_folder):
         'details': []
     }
     
-    for image in images:
+    for index, image in enumerate(images):
+        if progress:
+            progress(index, len(images))
         source_path = image.file_path
         dest_path = os.path.join(target_folder, image.file_name)
         
@@ -102,4 +271,97 @@ def export_images(image_ids, target_folder):
                 'reason': str(e)
             })
     
-    return results
\ No newline at end of file
+    return results
+
+def get_timeline(granularity='day'):
+    """撮影日時の集計テーブルから日別・月別の画像枚数を取得"""
+    if granularity not in TIMELINE_GRANULARITIES:
+        raise ValueError(f'Invalid granularity: {granularity}')
+
+    session = get_db_session()
+    period = func.substr(CaptureDateCount.day, 1, TIMELINE_GRANULARITIES[granularity])
+    rows = (session.query(period, func.sum(CaptureDateCount.count))
+            .group_by(period)
+            .order_by(period)
+            .all())
+    return [{'period': row[0], 'count': int(row[1])} for row in rows]
+
+def get_capture_date_rebuild_batches():
+    """
+    撮影日集計を月ごとに作り直すバッチの一覧を作成
+
+    Returns:
+        list: (SQLのリスト, パラメータ) のリスト（1件ずつ別のトランザクションで実行する）
+    """
+    session = get_db_session()
+    first, last = session.query(func.min(ImageMetadata.capture_time),
+                                func.max(ImageMetadata.capture_time)).one()
+
+    # 最初の範囲は空文字から、最後の範囲は全ての日付より大きい値までにして、
+    # 画像が無くなった日の集計も削除されるようにする
+    bounds = ['']
+    if first:
+        year, month = first.year, first.month
+        while (year, month) < (last.year, last.month):
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            bounds.append(f'{year:04d}-{month:02d}-01')
+    bounds.append('\uffff')
+    return [(CAPTURE_DATE_REBUILD_RANGE_SQL, {'lo': lo, 'hi': hi})
+            for lo, hi in zip(bounds, bounds[1:])]
+
+def get_rename_formats():
+    """設定されたリネームフォーマットとプリセットを取得"""
+    session = get_db_session()
+    setting = session.query(Settings).filter(Settings.key == 'fileRenaming.format').first()
+    configured = setting.get_value() if setting else None
+
+    formats = list(DEFAULT_RENAME_FORMATS)
+    if configured and configured not in formats:
+        formats.insert(0, configured)
+    return formats
+
+def backfill_capture_times(batch_size=500, overwrite=False, progress=None):
+    """
+    撮影時刻をファイル名・PNGテキストチャンク・更新日時から一括で補完する
+
+    Args:
+        batch_size: 1回のUPDATEでまとめる件数
+        overwrite: Trueなら既に撮影時刻がある画像も再計算する
+        progress: 進捗コールバック progress(処理済み件数, 全体の件数)
+
+    Returns:
+        dict: 補完結果（取得元ごとの件数）
+    """
+    session = get_db_session()
+    rename_formats = get_rename_formats()
+
+    query = session.query(ImageMetadata.id, ImageMetadata.file_path, ImageMetadata.file_name)
+    if not overwrite:
+        query = query.filter(ImageMetadata.capture_time.is_(None))
+    rows = query.all()
+
+    results = {
+        'total': len(rows),
+        'updated': 0,
+        'not_found': 0,
+        'sources': {'filename': 0, 'png_text': 0, 'mtime': 0}
+    }
+
+    updates = []
+    for index, (image_id, file_path, file_name) in enumerate(rows):
+        if progress:
+            progress(index, len(rows))
+        capture_time, source = extract_capture_time(file_path, file_name, rename_formats)
+        if not capture_time:
+            results['not_found'] += 1
+            continue
+        results['sources'][source] += 1
+        updates.append({'id': image_id, 'capture_time': capture_time})
+
+    # 主キー指定のバルクUPDATE（executemany）でまとめて書き込む
+    for start in range(0, len(updates), batch_size):
+        session.execute(update(ImageMetadata), updates[start:start + batch_size])
+    session.commit()
+    results['updated'] = len(updates)
+
+    return results
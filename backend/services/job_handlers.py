@@ -0,0 +1,63 @@
+from sqlalchemy import text
+from services.job_service import register_job_handler
+from services.image_service import (
+    get_db_session, export_images, backfill_capture_times, write_back_tags_rating,
+    get_capture_date_rebuild_batches
+)
+from services.friend_service import (
+    get_friend_index_rebuild_batches, get_friend_pairs_rebuild_batches
+)
+from services.sync_service import sync_settings_from_json, update_sync_status
+
+# 各処理関数は handler(params, context) の形で、戻り値がジョブの結果になる
+# context.progress(処理済み件数, 全体の件数) はキャンセル時にJobCancelledを送出する
+
+@register_job_handler('export')
+def run_export(params, context):
+    """画像エクスポート"""
+    return export_images(params.get('image_ids', []), params['target_folder'],
+                         progress=context.progress)
+
+@register_job_handler('sync_settings')
+def run_sync_settings(params, context):
+    """設定ファイルとDBの同期"""
+    result = sync_settings_from_json(params.get('json_path'))
+    if not result['success']:
+        raise RuntimeError(result.get('error', '同期に失敗しました'))
+    update_sync_status(result)
+    return result
+
+@register_job_handler('backfill_capture_time')
+def run_backfill_capture_time(params, context):
+    """撮影時刻の一括補完"""
+    return backfill_capture_times(overwrite=bool(params.get('overwrite', False)),
+                                  progress=context.progress)
+
+@register_job_handler('write_back_metadata')
+def run_write_back_metadata(params, context):
+    """タグ・評価のPNGへの書き戻し"""
+    return write_back_tags_rating(params.get('image_ids', []), progress=context.progress)
+
+@register_job_handler('reindex')
+def run_reindex(params, context):
+    """
+    撮影日集計とフレンドインデックスを既存データから作り直す
+
+    バッチごとにコミットするので、実行中も対話的な書き込みを長く待たせない
+    """
+    session = get_db_session()
+    batches = get_capture_date_rebuild_batches() + get_friend_index_rebuild_batches()
+    pairs_planned = False
+    index = 0
+    while index < len(batches):
+        context.progress(index, len(batches))
+        statements, values = batches[index]
+        for sql in statements:
+            session.execute(text(sql), values)
+        session.commit()
+        index += 1
+        # 組み合わせの区切りは作り直した画像ごとのインデックスから決めるので最後に追加する
+        if index == len(batches) and not pairs_planned:
+            batches += get_friend_pairs_rebuild_batches()
+            pairs_planned = True
+    return {'batches': len(batches)}
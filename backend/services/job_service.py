@@ -0,0 +1,314 @@
+import json
+import time
+import queue
+import itertools
+import threading
+from datetime import datetime, timedelta
+from flask import g
+import models
+from models.job import (
+    Job, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED,
+    JOB_FINISHED_STATUSES
+)
+
+# 終了したジョブを残す日数（引数や結果が溜まり続けないよう、これより古いものは削除）
+JOB_RETENTION_DAYS = 7
+
+_handlers = {}
+_queue = queue.PriorityQueue()
+_sequence = itertools.count()
+_cancel_events = {}
+_cancel_lock = threading.Lock()
+# 実行中ジョブの進捗（ハンドラーの未コミットの書き込みとロックを競合させないよう、
+# 実行中はメモリにだけ保持し、ジョブ終了時にまとめてDBへ書き込む）
+_progress = {}
+_progress_lock = threading.Lock()
+_workers = []
+_app = None
+
+class JobCancelled(Exception):
+    """ジョブがキャンセルされたことを示す例外"""
+
+def register_job_handler(job_type):
+    """ジョブの種類に処理関数を登録するデコレータ handler(params, context)"""
+    def decorator(handler):
+        _handlers[job_type] = handler
+        return handler
+    return decorator
+
+def get_job_types():
+    """登録済みのジョブの種類"""
+    return sorted(_handlers)
+
+def _job_session():
+    """ジョブ管理用のセッション（コミットしてもデータバージョンを進めない）"""
+    return models.Session(info={'skip_data_version': True})
+
+def _enqueue(job_id, priority):
+    # 優先度が大きいものから、同じ優先度なら登録順に実行
+    _queue.put((-priority, next(_sequence), job_id))
+
+def _pop_progress(job_id):
+    """実行中の進捗をメモリから取り出す（DBに書き込む列の辞書）"""
+    with _progress_lock:
+        return _progress.pop(job_id, {})
+
+def _apply_progress(job):
+    """実行中の進捗をジョブに反映（セッションはコミットせずに閉じること）"""
+    with _progress_lock:
+        values = dict(_progress.get(job.id, {}))
+    for key, value in values.items():
+        setattr(job, key, value)
+    return job
+
+def _update_job(job_id, **values):
+    """ジョブの列を更新して辞書形式で返す"""
+    session = _job_session()
+    try:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        for key, value in values.items():
+            setattr(job, key, value)
+        session.commit()
+        return job.to_dict()
+    finally:
+        session.close()
+
+def _complete_job(job_id, result):
+    """ジョブを成功として記録（進捗は全体の件数まで進める）"""
+    session = _job_session()
+    try:
+        job = session.get(Job, job_id)
+        for key, value in _pop_progress(job_id).items():
+            setattr(job, key, value)
+        job.status = JOB_SUCCEEDED
+        job.finished_at = datetime.now()
+        job.result = json.dumps(result, ensure_ascii=False, default=str)
+        if job.progress_total is not None:
+            job.progress_current = job.progress_total
+        session.commit()
+    finally:
+        session.close()
+
+class JobContext:
+    """ジョブ処理関数に渡す進捗報告・キャンセル確認用のオブジェクト"""
+
+    def __init__(self, job_id, cancel_event):
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+
+    def check_cancelled(self):
+        """キャンセルが要求されていればJobCancelledを送出"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, current, total=None, message=None):
+        """進捗を報告する（DBには書き込まず、get_job/SSEからはメモリの値が見える）"""
+        self.check_cancelled()
+        with _progress_lock:
+            values = _progress.setdefault(self.job_id, {})
+            values['progress_current'] = current
+            if total is not None:
+                values['progress_total'] = total
+            if message is not None:
+                values['message'] = message
+
+def submit_job(job_type, params=None, priority=0):
+    """
+    ジョブを登録してキューに追加する
+
+    Args:
+        job_type: ジョブの種類（register_job_handlerで登録したもの）
+        params: 処理関数に渡す引数（JSONに変換できる辞書）
+        priority: 優先度（大きいほど先に実行）
+
+    Returns:
+        dict: 登録したジョブ
+    """
+    if job_type not in _handlers:
+        raise ValueError(f'Unknown job type: {job_type}')
+
+    session = _job_session()
+    try:
+        job = Job(
+            job_type=job_type,
+            status=JOB_QUEUED,
+            priority=priority,
+            params=json.dumps(params or {}, ensure_ascii=False),
+            progress_current=0,
+            cancel_requested=False
+        )
+        session.add(job)
+        session.commit()
+        result = job.to_dict()
+    finally:
+        session.close()
+
+    _enqueue(result['id'], priority)
+    return result
+
+def get_job(job_id):
+    """ジョブを取得"""
+    session = _job_session()
+    try:
+        job = session.get(Job, job_id)
+        return _apply_progress(job).to_dict() if job else None
+    finally:
+        session.close()
+
+def list_jobs(status=None, limit=50):
+    """ジョブを新しい順に取得"""
+    session = _job_session()
+    try:
+        query = session.query(Job)
+        if status:
+            query = query.filter(Job.status == status)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        return [_apply_progress(job).to_dict() for job in jobs]
+    finally:
+        session.close()
+
+def cancel_job(job_id):
+    """ジョブのキャンセルを要求（待機中ならその場でキャンセル）"""
+    session = _job_session()
+    try:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        if job.status not in JOB_FINISHED_STATUSES:
+            job.cancel_requested = True
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finished_at = datetime.now()
+            session.commit()
+        result = job.to_dict()
+    finally:
+        session.close()
+
+    with _cancel_lock:
+        event = _cancel_events.get(job_id)
+    if event:
+        event.set()
+    return result
+
+def prune_jobs(retention_days=JOB_RETENTION_DAYS):
+    """終了してから保持期間を過ぎたジョブを削除し、削除件数を返す"""
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    session = _job_session()
+    try:
+        deleted = session.query(Job).filter(
+            Job.status.in_(JOB_FINISHED_STATUSES),
+            Job.finished_at < cutoff
+        ).delete(synchronize_session=False)
+        session.commit()
+        return deleted
+    finally:
+        session.close()
+
+def stream_job_events(job_id, interval=0.5):
+    """ジョブの状態をServer-Sent Events形式で送り続けるジェネレータ"""
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        if job != last:
+            yield f"event: progress\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            last = job
+        if job['status'] in JOB_FINISHED_STATUSES:
+            yield f"event: done\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            return
+        time.sleep(interval)
+
+def _run_job(job_id):
+    """ジョブを1件実行する"""
+    # 実行開始と同時に届いたキャンセル要求も受け取れるよう、先に登録しておく
+    cancel_event = threading.Event()
+    with _cancel_lock:
+        _cancel_events[job_id] = cancel_event
+
+    session = _job_session()
+    try:
+        job = session.get(Job, job_id)
+        # キャンセル済み・処理済みのジョブは実行しない
+        if job is None or job.status != JOB_QUEUED:
+            with _cancel_lock:
+                _cancel_events.pop(job_id, None)
+            return
+        job.status = JOB_RUNNING
+        job.started_at = datetime.now()
+        session.commit()
+        if job.cancel_requested:
+            cancel_event.set()
+        job_type = job.job_type
+        params = job.get_params()
+    finally:
+        session.close()
+
+    context = JobContext(job_id, cancel_event)
+
+    # サービス層が使うセッションをワーカー専用にする（共有セッションはスレッド安全でない）
+    with _app.app_context():
+        g.db_session = models.Session()
+        try:
+            result = _handlers[job_type](params, context)
+            _complete_job(job_id, result)
+        except JobCancelled:
+            g.db_session.rollback()
+            _update_job(job_id, status=JOB_CANCELLED, finished_at=datetime.now(),
+                        **_pop_progress(job_id))
+        except Exception as e:
+            g.db_session.rollback()
+            print(f"ジョブ {job_id} ({job_type}) エラー: {str(e)}")
+            _update_job(job_id, status=JOB_FAILED, finished_at=datetime.now(), error=str(e),
+                        **_pop_progress(job_id))
+        finally:
+            g.db_session.close()
+            with _cancel_lock:
+                _cancel_events.pop(job_id, None)
+
+def _worker_loop():
+    while True:
+        _, _, job_id = _queue.get()
+        try:
+            _run_job(job_id)
+            prune_jobs()
+        except Exception as e:
+            print(f"ジョブワーカーエラー: {str(e)}")
+        finally:
+            _queue.task_done()
+
+def start_job_workers(app, worker_count=2):
+    """
+    ジョブワーカーを起動する
+
+    前回の起動時に実行中だったジョブは失敗として記録し、
+    待機中だったジョブはキューに戻す。保持期間を過ぎた終了済みのジョブは削除する
+    """
+    global _app
+    if _workers:
+        return
+    _app = app
+
+    session = _job_session()
+    try:
+        interrupted = session.query(Job).filter(Job.status == JOB_RUNNING).all()
+        for job in interrupted:
+            job.status = JOB_FAILED
+            job.error = 'サーバーの再起動により中断されました'
+            job.finished_at = datetime.now()
+        session.commit()
+
+        for job in session.query(Job).filter(Job.status == JOB_QUEUED).order_by(Job.id).all():
+            _enqueue(job.id, job.priority)
+    finally:
+        session.close()
+
+    prune_jobs()
+
+    for _ in range(max(worker_count, 1)):
+        thread = threading.Thread(target=_worker_loop, daemon=True)
+        thread.start()
+        _workers.append(thread)
@@ -1,9 +1,11 @@
-from flask import current_app
+from flask import current_app, g
 from models import Session
 from models.settings import Settings
 
 def get_db_session():
-    """データベースセッションを取得"""
+    """データベースセッションを取得（ジョブ実行中はワーカー専用のセッション）"""
+    if 'db_session' in g:
+        return g.db_session
     return current_app.config['DB_SESSION']
 
 def get_all_settings():
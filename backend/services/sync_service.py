@@ -1,11 +1,13 @@
 import os
 import json
 import datetime
-from flask import current_app
+from flask import current_app, g
 from models.settings import Settings
 
 def get_db_session():
-    """データベースセッションを取得"""
+    """データベースセッションを取得（ジョブ実行中はワーカー専用のセッション）"""
+    if 'db_session' in g:
+        return g.db_session
     return current_app.config['DB_SESSION']
 
 def sync_settings_from_json(json_path=None):
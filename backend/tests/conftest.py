@@ -0,0 +1,5 @@
+import os
+import sys
+
+# backendディレクトリをインポートパスに追加（app.pyと同じくmodels/servicesを直接importする）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,53 @@
+from datetime import datetime
+import pytest
+from utils.capture_time import (
+    DEFAULT_RENAME_FORMATS, parse_capture_time_from_filename, rename_format_to_pattern
+)
+
+@pytest.mark.parametrize('file_name, expected', [
+    # VRChatの標準ファイル名
+    ('VRChat_2024-03-04_11-22-33.456_1920x1080.png', datetime(2024, 3, 4, 11, 22, 33, 456000)),
+    ('VRChat_2024-03-04_11-22-33_1920x1080.png', datetime(2024, 3, 4, 11, 22, 33)),
+    # リネームフォーマットのプリセット（DEFAULT_RENAME_FORMATSの順）
+    ('2024-03-04-1122-001.png', datetime(2024, 3, 4, 11, 22)),
+    ('2024_03_04_1122.png', datetime(2024, 3, 4, 11, 22)),
+    ('20240304_1122.png', datetime(2024, 3, 4, 11, 22)),
+    ('2024-03-04-月-1122.png', datetime(2024, 3, 4, 11, 22)),
+    ('2024-03-04-Mon-1122_001.png', datetime(2024, 3, 4, 11, 22)),
+    ('04-03-2024-1122.png', datetime(2024, 3, 4, 11, 22)),
+    ('03-25-2024-1122.png', datetime(2024, 3, 25, 11, 22)),
+    ('2024.03.04.1122.png', datetime(2024, 3, 4, 11, 22)),
+    ('1122_20240304.png', datetime(2024, 3, 4, 11, 22)),
+])
+def test_parse_capture_time_from_filename(file_name, expected):
+    assert parse_capture_time_from_filename(file_name) == expected
+
+def test_every_default_format_has_a_pattern():
+    for format_string in DEFAULT_RENAME_FORMATS:
+        assert rename_format_to_pattern(format_string) is not None, format_string
+
+def test_ambiguous_day_month_uses_first_matching_preset():
+    """dd-MM-yyyyはMM-dd-yyyyより先に照合される"""
+    assert parse_capture_time_from_filename('03-04-2024-1122.png') == datetime(2024, 4, 3, 11, 22)
+
+@pytest.mark.parametrize('file_name', [
+    'VRChat_2024-13-04_11-22-33.456_1920x1080.png',  # 13月
+    '2024-02-30-1122-001.png',  # 2月30日
+    'screenshot.png',
+])
+def test_invalid_or_unknown_names_return_none(file_name):
+    assert parse_capture_time_from_filename(file_name) is None
+
+def test_sequence_tokens_match_digits():
+    formats = ['yyyyMMdd_連番', 'seq_yyyyMMdd']
+    assert parse_capture_time_from_filename('20240304_12.png', formats) == datetime(2024, 3, 4)
+    assert parse_capture_time_from_filename('0042_20240304.png', formats) == datetime(2024, 3, 4)
+
+def test_duplicate_tokens_use_first_occurrence():
+    """同じトークンが2回ある場合は最初の値を使う"""
+    pattern = rename_format_to_pattern('yyyy-MM-dd_yyyy')
+    assert pattern.match('2024-03-04_1999').group('year') == '2024'
+
+def test_format_without_date_is_ignored():
+    assert rename_format_to_pattern('HHmm_seq') is None
+    assert parse_capture_time_from_filename('1122_001.png', ['HHmm_seq']) is None
@@ -0,0 +1,105 @@
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import text
+from models import init_db
+from models.image import ImageMetadata
+from models.job import Job, JOB_FINISHED_STATUSES, JOB_SUCCEEDED, JOB_QUEUED
+from services.image_service import get_db_session
+from services.job_service import (
+    register_job_handler, start_job_workers, submit_job, get_job,
+    prune_jobs, JOB_RETENTION_DAYS
+)
+import services.job_handlers  # reindexなどの処理関数を登録する
+
+def wait_for_job(job_id, timeout=15):
+    """ジョブが終了するまで待つ"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job['status'] in JOB_FINISHED_STATUSES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish: {get_job(job_id)}')
+
+def test_handler_can_write_and_report_progress(tmp_path):
+    """未コミットの書き込みがあるハンドラーから進捗を報告してもロックで失敗しない"""
+    app = Flask(__name__)
+    app.config['DB_SESSION'] = init_db(str(tmp_path / 'jobs.db'))
+    start_job_workers(app, 1)
+
+    observed = []
+
+    @register_job_handler('test_write_and_progress')
+    def write_and_progress(params, context):
+        session = get_db_session()
+        for i in range(3):
+            session.add(ImageMetadata(f'/images/{i}.png', f'{i}.png'))
+            session.flush()  # 書き込みトランザクションを開いたまま進捗を報告
+            context.progress(i + 1, 3)
+            observed.append(get_job(context.job_id)['progress']['current'])
+        session.commit()
+        return {'written': 3}
+
+    job = wait_for_job(submit_job('test_write_and_progress')['id'])
+
+    assert job['status'] == JOB_SUCCEEDED, job['error']
+    assert job['result'] == {'written': 3}
+    assert job['progress']['current'] == 3
+    assert observed == [1, 2, 3]
+    assert app.config['DB_SESSION'].query(ImageMetadata).count() == 3
+
+def test_prune_jobs_removes_only_old_finished_jobs(tmp_path):
+    """保持期間を過ぎた終了済みのジョブだけを削除する"""
+    session = init_db(str(tmp_path / 'prune.db'))
+    old = datetime.now() - timedelta(days=JOB_RETENTION_DAYS + 1)
+    session.add_all([
+        Job(job_type='export', status=JOB_SUCCEEDED, finished_at=old),
+        Job(job_type='export', status=JOB_SUCCEEDED, finished_at=datetime.now()),
+        Job(job_type='export', status=JOB_QUEUED, created_at=old),
+    ])
+    session.commit()
+
+    assert prune_jobs() == 1
+    assert sorted(job.status for job in session.query(Job)) == [JOB_QUEUED, JOB_SUCCEEDED]
+
+def test_reindex_rebuilds_rollups_in_batches(tmp_path):
+    """バッチごとにコミットしながら、壊れた集計とインデックスを作り直す"""
+    app = Flask(__name__)
+    session = init_db(str(tmp_path / 'reindex.db'))
+    app.config['DB_SESSION'] = session
+    start_job_workers(app, 1)
+
+    assert session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+
+    session.add_all([
+        ImageMetadata(f'/images/{i}.png', f'{i}.png', friends=friends,
+                      capture_time=datetime(2024, month, 1 + i))
+        for i, (month, friends) in enumerate([
+            (1, ['Alice', 'Bob']), (1, ['Alice', 'Bob', 'Carol']), (3, ['Bob', 'Carol']), (3, None)
+        ])
+    ])
+    session.commit()
+    expected_days = session.execute(text(
+        'SELECT day, count FROM capture_date_counts ORDER BY day')).fetchall()
+    expected_pairs = session.execute(text(
+        'SELECT friend_a, friend_b, count FROM friend_pairs ORDER BY 1, 2')).fetchall()
+
+    # 集計とインデックスを壊す
+    session.execute(text("DELETE FROM capture_date_counts WHERE day LIKE '2024-01%'"))
+    session.execute(text("INSERT INTO capture_date_counts (day, count) VALUES ('2023-12-31', 5)"))
+    session.execute(text('UPDATE friend_pairs SET count = 99'))
+    session.execute(text('INSERT INTO image_friends (friend_id, image_id) VALUES (1, 999)'))
+    session.commit()
+
+    job = wait_for_job(submit_job('reindex')['id'])
+
+    assert job['status'] == JOB_SUCCEEDED, job['error']
+    assert job['result']['batches'] > 1
+    session.expire_all()
+    assert session.execute(text(
+        'SELECT day, count FROM capture_date_counts ORDER BY day')).fetchall() == expected_days
+    assert session.execute(text(
+        'SELECT friend_a, friend_b, count FROM friend_pairs ORDER BY 1, 2')).fetchall() == expected_pairs
+    assert session.execute(text(
+        'SELECT COUNT(*) FROM image_friends WHERE image_id = 999')).scalar() == 0
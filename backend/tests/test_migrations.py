@@ -0,0 +1,126 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine
+from models import Base
+import models.migrations as migrations
+from models.migrations import LATEST_VERSION, run_migrations, get_columns
+
+# 旧バージョンのimage_metadata（username/tags/rating列が無い）
+OLD_SCHEMA = """
+    CREATE TABLE image_metadata (
+        id INTEGER PRIMARY KEY,
+        file_path VARCHAR(255) NOT NULL UNIQUE,
+        file_name VARCHAR(255) NOT NULL,
+        world_id VARCHAR(100),
+        world_name VARCHAR(255),
+        friends TEXT,
+        capture_time DATETIME,
+        created_at DATETIME,
+        updated_at DATETIME
+    );
+    CREATE TABLE settings (
+        id INTEGER PRIMARY KEY,
+        key VARCHAR(100) NOT NULL UNIQUE,
+        value TEXT
+    );
+"""
+
+def make_old_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.executemany(
+        "INSERT INTO image_metadata (file_path, file_name, friends, capture_time) VALUES (?, ?, ?, ?)",
+        [
+            ('/a.png', 'a.png', '["Alice", "Bob"]', '2024-03-04 11:22:33.000000'),
+            ('/b.png', 'b.png', '["Alice", "Bob", "Carol"]', '2024-03-04 20:00:00.000000'),
+            ('/c.png', 'c.png', 'not json', '2024-03-05 08:00:00.000000'),
+            ('/d.png', 'd.png', None, None),
+        ]
+    )
+    conn.commit()
+    conn.close()
+    return create_engine(f'sqlite:///{path}')
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_old_database_migrates_to_latest(tmp_path):
+    path = str(tmp_path / 'old.db')
+    engine = make_old_db(path)
+
+    assert run_migrations(engine) == LATEST_VERSION
+    assert user_version(path) == LATEST_VERSION
+
+    conn = sqlite3.connect(path)
+    try:
+        assert {'username', 'tags', 'rating'} <= get_columns(conn, 'image_metadata')
+        assert 'jobs' in {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        # 既存の画像から撮影日集計が作られている
+        assert conn.execute(
+            "SELECT day, count FROM capture_date_counts ORDER BY day").fetchall() == [
+            ('2024-03-04', 2), ('2024-03-05', 1)]
+
+        # 既存の画像からフレンド共起インデックスが作られている（不正なJSONは無視）
+        pairs = conn.execute("""
+            SELECT a.name, b.name, p.count FROM friend_pairs AS p
+            JOIN friends AS a ON a.id = p.friend_a
+            JOIN friends AS b ON b.id = p.friend_b
+        """).fetchall()
+        assert sorted(tuple(sorted(pair[:2])) + (pair[2],) for pair in pairs) == [
+            ('Alice', 'Bob', 2), ('Alice', 'Carol', 1), ('Bob', 'Carol', 1)]
+
+        # 移行後の書き込みにもトリガーが追従する
+        conn.execute("INSERT INTO image_metadata (file_path, file_name, friends, capture_time) "
+                     "VALUES ('/e.png', 'e.png', '[\"Bob\", \"Carol\"]', '2024-03-05 09:00:00')")
+        conn.commit()
+        assert conn.execute("SELECT count FROM capture_date_counts "
+                            "WHERE day = '2024-03-05'").fetchone()[0] == 2
+        assert conn.execute("""
+            SELECT p.count FROM friend_pairs AS p
+            JOIN friends AS a ON a.id = p.friend_a
+            JOIN friends AS b ON b.id = p.friend_b
+            WHERE a.name IN ('Bob', 'Carol') AND b.name IN ('Bob', 'Carol')
+        """).fetchone()[0] == 2
+    finally:
+        conn.close()
+
+def test_failing_step_rolls_back(tmp_path, monkeypatch):
+    path = str(tmp_path / 'failing.db')
+    engine = make_old_db(path)
+    run_migrations(engine)
+
+    def broken_step(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError('migration failed')
+
+    failing_version = LATEST_VERSION + 1
+    monkeypatch.setattr(migrations, 'MIGRATIONS',
+                        migrations.MIGRATIONS + [(failing_version, 'broken', broken_step)])
+    monkeypatch.setattr(migrations, 'LATEST_VERSION', failing_version)
+
+    with pytest.raises(RuntimeError):
+        run_migrations(engine)
+
+    assert user_version(path) == LATEST_VERSION
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    finally:
+        conn.close()
+
+def test_current_database_skips_create_all(tmp_path, monkeypatch):
+    path = str(tmp_path / 'current.db')
+    engine = create_engine(f'sqlite:///{path}')
+    assert run_migrations(engine) == LATEST_VERSION
+
+    calls = []
+    monkeypatch.setattr(Base.metadata, 'create_all', lambda *args, **kwargs: calls.append(args))
+
+    assert run_migrations(engine) == LATEST_VERSION
+    assert calls == []
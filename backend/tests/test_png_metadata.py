@@ -0,0 +1,50 @@
+import threading
+from flask import Flask
+from PIL import Image
+from models import init_db
+from models.image import ImageMetadata
+from services.image_service import update_images_tags_rating, write_back_tags_rating
+from utils.png_metadata import read_png_text, write_png_metadata
+
+def make_png(path):
+    Image.new('RGB', (4, 4)).save(path, format='PNG')
+    return str(path)
+
+def test_concurrent_writes_to_one_file(tmp_path):
+    """同じファイルへの同時書き込みがすべて成功し、どちらの更新も失われない"""
+    file_path = make_png(tmp_path / 'image.png')
+    results = []
+
+    def write(key):
+        results.append(write_png_metadata(file_path, {key: 'value'}))
+
+    threads = [threading.Thread(target=write, args=(f'Key{i}',)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 8
+    text = read_png_text(file_path)
+    assert all(text.get(f'Key{i}') == 'value' for i in range(8))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['image.png']
+
+def test_write_back_uses_current_db_values(tmp_path):
+    """書き戻しは登録時ではなく実行時のタグ・評価を書き込む"""
+    app = Flask(__name__)
+    session = init_db(str(tmp_path / 'write_back.db'))
+    app.config['DB_SESSION'] = session
+    file_path = make_png(tmp_path / 'image.png')
+    session.add(ImageMetadata(file_path, 'image.png'))
+    session.commit()
+    image_id = session.query(ImageMetadata.id).scalar()
+
+    with app.app_context():
+        update_images_tags_rating([image_id], add_tags=['夜景'])
+        update_images_tags_rating([image_id], rating=5, update_rating=True)
+        result = write_back_tags_rating([image_id])
+
+    assert result == {'total': 1, 'written': 1}
+    text = read_png_text(file_path)
+    assert text['Tags'] == '["夜景"]'
+    assert text['Rating'] == '5'
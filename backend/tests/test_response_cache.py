@@ -0,0 +1,59 @@
+from flask import Flask
+import models
+from models import init_db
+from models.image import ImageMetadata
+from models.settings import Settings
+from routes import register_routes
+from utils.response_cache import get_data_version
+
+def make_client(tmp_path):
+    app = Flask(__name__)
+    session = init_db(str(tmp_path / 'cache.db'))
+    app.config['DB_SESSION'] = session
+    register_routes(app)
+    session.add(ImageMetadata('/images/a.png', 'a.png'))
+    session.commit()
+    return app.test_client(), session.query(ImageMetadata.id).scalar()
+
+def test_committed_write_changes_etag(tmp_path):
+    """書き込みのコミット後は以前のETagで304を返さない"""
+    client, image_id = make_client(tmp_path)
+
+    first = client.get('/api/images/')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get('/api/images/', headers={'If-None-Match': etag}).status_code == 304
+
+    response = client.patch('/api/images', json={'ids': [image_id], 'add_tags': ['夜景']})
+    assert response.get_json()['result']['updated'] == 1
+
+    after = client.get('/api/images/', headers={'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+    assert after.get_json()['images'][0]['tags'] == ['夜景']
+
+def test_settings_update_changes_etag(tmp_path):
+    client, _ = make_client(tmp_path)
+
+    etag = client.get('/api/settings/').headers['ETag']
+    assert client.put('/api/settings/', json={'theme': 'dark'}).status_code == 200
+
+    after = client.get('/api/settings/', headers={'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+
+def test_skip_data_version_session_keeps_etag(tmp_path):
+    """skip_data_versionを指定したセッションのコミットではETagが変わらない"""
+    client, _ = make_client(tmp_path)
+    etag = client.get('/api/settings/').headers['ETag']
+    version = get_data_version()
+
+    session = models.Session(info={'skip_data_version': True})
+    try:
+        session.add(Settings(key='internal', value='1'))
+        session.commit()
+    finally:
+        session.close()
+
+    assert get_data_version() == version
+    assert client.get('/api/settings/', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,151 @@
+import os
+import re
+from datetime import datetime
+from utils.png_metadata import read_png_text
+
+# VRChatの標準ファイル名: VRChat_YYYY-MM-DD_HH-MM-SS.fff_WxH.png
+VRCHAT_FILENAME_PATTERN = re.compile(
+    r'VRChat_(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})_'
+    r'(?P<hour>\d{2})-(?P<minute>\d{2})-(?P<second>\d{2})(?:\.(?P<millisecond>\d{3}))?'
+)
+
+# VSA-launcherのリネームフォーマットプリセット（RenameFormatSettings.csと同じ）
+DEFAULT_RENAME_FORMATS = [
+    'yyyy-MM-dd-HHmm-seq',
+    'yyyy_MM_dd_HHmm',
+    'yyyyMMdd_HHmm',
+    'yyyy-MM-dd-ddd-HHmm',
+    'dd-MM-yyyy-HHmm',
+    'MM-dd-yyyy-HHmm',
+    'yyyy.MM.dd.HHmm',
+    'HHmm_yyyyMMdd',
+]
+
+# .NETの日付書式トークン -> 正規表現（長いトークンから順に照合する）
+_FORMAT_TOKENS = [
+    ('yyyy', r'(?P<year>\d{4})'),
+    ('ddd', r'[^-_.\d]+'),  # 曜日の短縮名（ja-JPは「月」、en-USは「Mon」など）
+    ('fff', r'(?P<millisecond>\d{3})'),
+    ('seq', r'\d+'),
+    ('連番', r'\d+'),
+    ('MM', r'(?P<month>\d{2})'),
+    ('dd', r'(?P<day>\d{2})'),
+    ('HH', r'(?P<hour>\d{2})'),
+    ('mm', r'(?P<minute>\d{2})'),
+    ('ss', r'(?P<second>\d{2})'),
+]
+
+# PNGテキストチャンク内の撮影時刻キー（VSA-launcherのMetadataProcessor.cs）
+CAPTURE_TIME_TEXT_KEY = 'CaptureTime'
+
+_format_pattern_cache = {}
+
+def rename_format_to_pattern(format_string):
+    """リネームフォーマット文字列をファイル名照合用の正規表現に変換"""
+    if format_string in _format_pattern_cache:
+        return _format_pattern_cache[format_string]
+
+    parts = []
+    used_groups = set()
+    i = 0
+    while i < len(format_string):
+        for token, regex in _FORMAT_TOKENS:
+            if format_string.startswith(token, i):
+                # 同じ名前付きグループは2回使えないため、2回目以降は非キャプチャにする
+                group = re.match(r'\(\?P<(\w+)>', regex)
+                if group:
+                    if group.group(1) in used_groups:
+                        regex = re.sub(r'\(\?P<\w+>', '(?:', regex)
+                    used_groups.add(group.group(1))
+                parts.append(regex)
+                i += len(token)
+                break
+        else:
+            parts.append(re.escape(format_string[i]))
+            i += 1
+
+    # 日付が特定できないフォーマットは使わない
+    if not {'year', 'month', 'day'} <= used_groups:
+        pattern = None
+    else:
+        pattern = re.compile('^' + ''.join(parts))
+    _format_pattern_cache[format_string] = pattern
+    return pattern
+
+def _datetime_from_match(match):
+    """正規表現のマッチ結果からdatetimeを組み立てる"""
+    values = match.groupdict()
+    try:
+        return datetime(
+            int(values['year']),
+            int(values['month']),
+            int(values['day']),
+            int(values.get('hour') or 0),
+            int(values.get('minute') or 0),
+            int(values.get('second') or 0),
+            int(values.get('millisecond') or 0) * 1000
+        )
+    except ValueError:
+        return None  # 存在しない日付（13月など）
+
+def parse_capture_time_from_filename(file_name, rename_formats=None):
+    """ファイル名から撮影時刻を推定（VRChat形式 -> リネーム形式の順）"""
+    base_name = os.path.splitext(os.path.basename(file_name))[0]
+
+    match = VRCHAT_FILENAME_PATTERN.search(base_name)
+    if match:
+        capture_time = _datetime_from_match(match)
+        if capture_time:
+            return capture_time
+
+    for format_string in rename_formats or DEFAULT_RENAME_FORMATS:
+        pattern = rename_format_to_pattern(format_string)
+        if not pattern:
+            continue
+        match = pattern.match(base_name)
+        if match:
+            capture_time = _datetime_from_match(match)
+            if capture_time:
+                return capture_time
+    return None
+
+def parse_capture_time_from_png(file_path):
+    """PNGのテキストチャンクから撮影時刻を取得"""
+    value = read_png_text(file_path).get(CAPTURE_TIME_TEXT_KEY)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+def extract_capture_time(file_path, file_name=None, rename_formats=None):
+    """
+    撮影時刻を推定する
+
+    優先順位: VRChatファイル名 -> リネーム形式のファイル名 -> PNGテキストチャンク -> 更新日時
+
+    Args:
+        file_path: 画像ファイルのパス
+        file_name: ファイル名（省略時はfile_pathから取得）
+        rename_formats: 照合するリネームフォーマットのリスト
+
+    Returns:
+        tuple: (datetime or None, 取得元 'filename' / 'png_text' / 'mtime')
+    """
+    capture_time = parse_capture_time_from_filename(file_name or file_path, rename_formats)
+    if capture_time:
+        return capture_time, 'filename'
+
+    if not os.path.exists(file_path):
+        return None, None
+
+    if file_path.lower().endswith('.png'):
+        capture_time = parse_capture_time_from_png(file_path)
+        if capture_time:
+            return capture_time, 'png_text'
+
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(file_path)), 'mtime'
+    except OSError:
+        return None, None
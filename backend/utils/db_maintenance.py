@@ -0,0 +1,141 @@
+import os
+import glob
+import sqlite3
+import threading
+from datetime import datetime
+
+# バックアップ1ステップでコピーするページ数と、ステップ間の待機秒数
+# （ステップの合間に他の接続が読み書きできるので、サーバーが止まらない）
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+
+SNAPSHOT_PREFIX = 'vsa_data_'
+SNAPSHOT_TIME_FORMAT = '%Y%m%d_%H%M%S'
+
+def backup_database(source_path, target_path, pages=BACKUP_PAGES_PER_STEP,
+                    sleep=BACKUP_STEP_SLEEP, progress=None):
+    """
+    SQLiteのバックアップAPIで稼働中のデータベースを安全にコピーする
+
+    一時ファイルにコピーしてから置き換えるので、途中で失敗しても
+    既存のtarget_pathは壊れない
+
+    Args:
+        source_path: コピー元データベースのパス
+        target_path: コピー先データベースのパス
+        pages: 1ステップでコピーするページ数
+        sleep: ステップ間の待機秒数
+        progress: 進捗コールバック progress(status, remaining, total)
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"データベースが見つかりません: {source_path}")
+
+    target_dir = os.path.dirname(os.path.abspath(target_path))
+    os.makedirs(target_dir, exist_ok=True)
+
+    temp_path = f"{target_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(temp_path)
+    try:
+        source.backup(target, pages=pages, progress=progress, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(temp_path, target_path)
+    return target_path
+
+def create_snapshot(db_path, snapshot_dir, retention=None):
+    """
+    データベースのスナップショットを作成し、古いものを削除する
+
+    Args:
+        db_path: データベースのパス
+        snapshot_dir: スナップショットの保存先フォルダ
+        retention: 保持するスナップショット数（Noneなら削除しない）
+
+    Returns:
+        dict: 作成したスナップショットのパスと削除したスナップショット
+    """
+    file_name = f"{SNAPSHOT_PREFIX}{datetime.now().strftime(SNAPSHOT_TIME_FORMAT)}.db"
+    snapshot_path = os.path.join(snapshot_dir, file_name)
+    backup_database(db_path, snapshot_path)
+
+    removed = []
+    if retention is not None:
+        removed = prune_snapshots(snapshot_dir, retention)
+    return {'path': snapshot_path, 'removed': removed}
+
+def list_snapshots(snapshot_dir):
+    """スナップショットを新しい順に取得"""
+    pattern = os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}*.db")
+    # ファイル名に日時が入っているので名前順 = 作成順
+    return sorted(glob.glob(pattern), reverse=True)
+
+def prune_snapshots(snapshot_dir, retention):
+    """保持数を超えた古いスナップショットを削除"""
+    removed = []
+    for path in list_snapshots(snapshot_dir)[max(retention, 1):]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"スナップショットの削除に失敗: {path} ({str(e)})")
+    return removed
+
+def optimize_database(db_path, vacuum_into=None, analyze=True):
+    """
+    データベースのメンテナンス（ANALYZE / PRAGMA optimize / VACUUM INTO）
+
+    Args:
+        db_path: データベースのパス
+        vacuum_into: 指定した場合、最適化したコピーをこのパスに作成
+        analyze: Trueなら統計情報を全テーブルで取り直す
+
+    Returns:
+        dict: 実行した処理
+    """
+    result = {'analyze': False, 'optimize': False, 'vacuum_into': None}
+    conn = sqlite3.connect(db_path)
+    try:
+        if analyze:
+            # 統計情報を更新してクエリプランを最新のデータ量に合わせる
+            conn.execute("ANALYZE")
+            result['analyze'] = True
+        conn.execute("PRAGMA optimize")
+        result['optimize'] = True
+        conn.commit()
+
+        if vacuum_into:
+            if os.path.exists(vacuum_into):
+                raise FileExistsError(f"出力先が既に存在します: {vacuum_into}")
+            conn.execute("VACUUM INTO ?", (vacuum_into,))
+            result['vacuum_into'] = vacuum_into
+    finally:
+        conn.close()
+    return result
+
+def start_snapshot_scheduler(db_path, snapshot_dir, interval_hours, retention):
+    """
+    一定間隔でスナップショットとPRAGMA optimizeを実行するバックグラウンドスレッドを開始
+
+    Returns:
+        threading.Event: set()するとスケジューラーが停止する
+    """
+    stop_event = threading.Event()
+    interval = interval_hours * 3600
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                result = create_snapshot(db_path, snapshot_dir, retention)
+                optimize_database(db_path, analyze=False)
+                print(f"スナップショットを作成しました: {result['path']}")
+            except Exception as e:
+                print(f"スナップショット作成エラー: {str(e)}")
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event
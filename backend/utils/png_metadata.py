@@ -1,6 +1,19 @@
-from PIL import Image
+from PIL import Image, PngImagePlugin
+import os
 import json
 import io
+import shutil
+import tempfile
+import threading
+
+# 同じファイルへの書き込みを直列化するロック（パスのハッシュで振り分け、数は固定）
+_PATH_LOCK_COUNT = 64
+_path_locks = [threading.RLock() for _ in range(_PATH_LOCK_COUNT)]
+
+def png_write_lock(file_path):
+    """ファイルごとの書き込みロックを取得（読み取り→書き込みをまとめて保護する場合に使う）"""
+    key = os.path.normcase(os.path.abspath(file_path))
+    return _path_locks[hash(key) % _PATH_LOCK_COUNT]
 
 def read_png_metadata(file_path):
     """PNG画像からメタデータを読み取る"""
@@ -32,26 +45,64 @@ def read_png_metadata(file_path):
         print(f"Error reading metadata from {file_path}: {e}")
         return {}
 
+def read_png_text(file_path):
+    """PNG画像のテキストチャンクをすべて文字列の辞書として読み取る"""
+    try:
+        with Image.open(file_path) as img:
+            # textプロパティはIDAT以降のチャンクも含めて返す
+            text = getattr(img, 'text', None) or {}
+            return {str(key): str(value) for key, value in text.items()}
+    except Exception as e:
+        print(f"Error reading text chunks from {file_path}: {e}")
+        return {}
+
 def write_png_metadata(file_path, metadata_dict):
-    """PNG画像にメタデータを書き込む"""
+    """PNG画像にメタデータを書き込む（既存のテキストチャンクは保持）"""
+    temp_path = None
     try:
-        # 画像を開く
-        img = Image.open(file_path)
-        
-        # メタデータをテキスト形式に変換
-        text_info = {}
-        for key, value in metadata_dict.items():
-            if isinstance(value, (dict, list)):
-                # 辞書やリストはJSONに変換
-                text_info[key] = json.dumps(value)
-            else:
-                text_info[key] = str(value)
-        
-        # メタデータを追加して保存
-        img_with_metadata = img.copy()
-        img_with_metadata.save(file_path, pnginfo=text_info)
+        # 同じファイルへの同時書き込みで更新が失われないよう、読み込みから置き換えまでロックする
+        with png_write_lock(file_path):
+            # 画像を開く
+            with Image.open(file_path) as img:
+                img.load()
+                
+                # 既存のテキストチャンクを引き継ぐ
+                pnginfo = PngImagePlugin.PngInfo()
+                existing = dict(getattr(img, 'text', None) or {})
+                
+                # メタデータをテキスト形式に変換
+                for key, value in metadata_dict.items():
+                    if isinstance(value, (dict, list)):
+                        # 辞書やリストはJSONに変換
+                        existing[key] = json.dumps(value, ensure_ascii=False)
+                    elif value is None:
+                        existing.pop(key, None)
+                    else:
+                        existing[key] = str(value)
+                
+                for key, value in existing.items():
+                    if value.isascii():
+                        pnginfo.add_text(key, value)
+                    else:
+                        # 日本語を含む値はUTF-8のiTXtチャンクで保存
+                        pnginfo.add_itxt(key, value)
+                
+                img_with_metadata = img.copy()
+            
+            # 同じフォルダの一意な一時ファイルに保存してから置き換え（書き込み途中で元画像を壊さない）
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(file_path) or None)
+            with os.fdopen(fd, 'wb') as temp_file:
+                img_with_metadata.save(temp_file, format='PNG', pnginfo=pnginfo)
+            # mkstempは所有者のみのパーミッションで作成するので元画像に合わせる
+            shutil.copymode(file_path, temp_path)
+            os.replace(temp_path, file_path)
+            temp_path = None
         
         return True
     except Exception as e:
         print(f"Error writing metadata to {file_path}: {e}")
-        return False
\ No newline at end of file
+        return False
+    finally:
+        # 失敗した場合は一時ファイルを残さない
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,140 @@
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+# キャッシュの上限（件数・合計サイズ）と有効期限
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_TTL_SECONDS = 300
+
+_data_version = 0
+_version_lock = threading.Lock()
+
+# プロセスごとの識別子（再起動でバージョンが0に戻っても以前のETagと一致させない）
+_process_token = uuid.uuid4().hex
+
+def get_data_version():
+    """現在のデータバージョンを取得"""
+    return _data_version
+
+def bump_data_version():
+    """データバージョンを進める（古いバージョンのキャッシュとETagは使われなくなる）"""
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+        return _data_version
+
+# 読み取り系のサービスはコミットしないので、コミット = 書き込みとみなす
+# （ジョブの進捗更新など、レスポンスに影響しないセッションはinfoで除外する）
+@event.listens_for(OrmSession, 'after_commit')
+def _bump_on_commit(session):
+    if not session.info.get('skip_data_version'):
+        bump_data_version()
+
+class ResponseCache:
+    """シリアライズ済みレスポンスのLRU/TTLキャッシュ"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (有効期限, body, mimetype, headers)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1:]
+
+    def set(self, key, body, mimetype, headers=None):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, body, mimetype, headers or {})
+            self._size += len(body)
+            # 古いものから削除して上限内に収める
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        body = self._entries.pop(key)[1]
+        self._size -= len(body)
+
+response_cache = ResponseCache()
+
+# レスポンス形式・圧縮の判定に使うヘッダー（値が違えば別のキャッシュ）
+VARY_HEADERS = ('Accept', 'Accept-Encoding')
+
+# キャッシュしたレスポンスに復元するヘッダー
+STORED_HEADERS = ('Content-Encoding', 'Vary')
+
+def make_cache_key(view_args=None):
+    """パスと正規化したクエリパラメータ・ヘッダーからキャッシュキーを作成"""
+    # 空の値は未指定と同じ扱いなので除外し、キー順を揃える
+    params = tuple(sorted(
+        (key, tuple(value for value in request.args.getlist(key) if value))
+        for key in request.args.keys()
+    ))
+    params = tuple(item for item in params if item[1])
+    headers = tuple(request.headers.get(name, '') for name in VARY_HEADERS)
+    return (request.path, params, tuple(sorted((view_args or {}).items())), headers)
+
+def make_etag(version, key):
+    """プロセス識別子・データバージョン・キャッシュキーからETagを作成"""
+    return hashlib.sha1(repr((_process_token, version, key)).encode('utf-8')).hexdigest()
+
+def cached_response(view):
+    """
+    GETのレスポンスをキャッシュし、ETagを付けるデコレータ
+
+    If-None-Matchが一致すればDBにアクセスせず304を返す。
+    データバージョンが変わると以前のキャッシュとETagは無効になる
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = get_data_version()
+        key = make_cache_key(kwargs)
+        etag = make_etag(version, key)
+
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        cached = response_cache.get((version, key))
+        if cached is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            # エラーレスポンスはキャッシュしない
+            if response.status_code != 200:
+                return response
+            headers = {name: response.headers[name] for name in STORED_HEADERS
+                       if name in response.headers}
+            cached = (response.get_data(), response.mimetype, headers)
+            response_cache.set((version, key), *cached)
+
+        response = Response(cached[0], mimetype=cached[1], headers=cached[2])
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
@@ -0,0 +1,107 @@
+import json
+import gzip
+from flask import request, Response
+
+# 任意の依存パッケージ（未インストールなら該当フォーマット・圧縮は提供しない）
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIMETYPE_JSON = 'application/json'
+MIMETYPE_COLUMNAR_JSON = 'application/vnd.vsa.columnar+json'
+MIMETYPE_MSGPACK = 'application/x-msgpack'
+
+# ?format= で指定する場合の名前
+FORMAT_MIMETYPES = {
+    'json': MIMETYPE_JSON,
+    'columnar': MIMETYPE_COLUMNAR_JSON,
+    'msgpack': MIMETYPE_MSGPACK,
+}
+
+# これより小さいレスポンスは圧縮しない
+COMPRESS_MIN_BYTES = 4096
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def available_mimetypes():
+    """このサーバーで返せるレスポンス形式"""
+    mimetypes = [MIMETYPE_JSON, MIMETYPE_COLUMNAR_JSON]
+    if msgpack is not None:
+        mimetypes.append(MIMETYPE_MSGPACK)
+    return mimetypes
+
+def negotiate_mimetype():
+    """
+    ?format= またはAcceptヘッダーからレスポンス形式を決める
+
+    どちらの指定も無い・対応していない場合は従来のJSON
+    """
+    format_name = request.args.get('format')
+    if format_name:
+        mimetype = FORMAT_MIMETYPES.get(format_name)
+        return mimetype if mimetype in available_mimetypes() else None
+
+    # 明示的に要求された場合のみ列形式を返す（*/*は従来のJSON）
+    best = request.accept_mimetypes.best_match(available_mimetypes(), default=MIMETYPE_JSON)
+    if best != MIMETYPE_JSON and request.accept_mimetypes.quality(best) > \
+            request.accept_mimetypes.quality(MIMETYPE_JSON):
+        return best
+    return MIMETYPE_JSON
+
+def encode_columnar(mimetype, columns, rows, extra=None):
+    """
+    列名と行を列形式にエンコードする
+
+    - 列形式JSON: {"columns": [...], "rows": [[...], ...]}（キーを1回だけ持つ）
+    - MessagePack: {"columns": [...], "data": [[列1の値...], [列2の値...]]}（列ごとの配列）
+    """
+    payload = dict(extra or {})
+    payload['columns'] = columns
+    if mimetype == MIMETYPE_MSGPACK:
+        payload['data'] = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+        return msgpack.packb(payload, use_bin_type=True)
+
+    payload['rows'] = rows
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def negotiate_encoding():
+    """Accept-Encodingから圧縮方式を決める（zstd優先）"""
+    if zstandard is not None and request.accept_encodings['zstd']:
+        return 'zstd'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    """大きいレスポンスをクライアントが対応する方式で圧縮する"""
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or response.content_encoding or response.direct_passthrough:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding == 'zstd':
+        body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(body)
+    response.content_encoding = encoding
+    return response
+
+def make_columnar_response(mimetype, columns, rows, extra=None):
+    """列形式のレスポンスを作成（必要に応じて圧縮）"""
+    response = Response(encode_columnar(mimetype, columns, rows, extra), mimetype=mimetype)
+    response.vary.add('Accept')
+    return compress_response(response)